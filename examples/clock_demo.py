@@ -3,7 +3,7 @@ from machine import I2C, RTC
 import time
 
 i2c = I2C(0, scl=Pin(5), sda=Pin(4))
-gfx = SillyGFX(128, 64, i2c=i2c)
+gfx = SillyGFX(128, 64, i2c=i2c, double_buffer=True)  # Шлём только разницу кадров
 rtc = RTC()
 
 while True:
@@ -1,14 +1,29 @@
 from sillyGFX import SillyGFX
+from sillyGFX.sprite import SpriteSheet, Sprite
 from machine import I2C, Pin
 import time
 import random
 
 i2c = I2C(0, scl=Pin(5), sda=Pin(4))
-gfx = SillyGFX(128, 64, i2c=i2c)
+gfx = SillyGFX(128, 64, i2c=i2c, double_buffer=True)  # Шлём только разницу кадров
+
+# Лист из двух кадров 8x8: сегмент змейки и еда (строки по 2 байта, младший бит слева)
+tiles = SpriteSheet.from_bitmap(bytes([
+    0xFF, 0xFF,
+    0xFF, 0x81,
+    0xFF, 0x81,
+    0xFF, 0x81,
+    0xFF, 0x81,
+    0xFF, 0x81,
+    0xFF, 0x81,
+    0xFF, 0xFF,
+]), 16, 8, 8, 8)
 
 # Инициализация игры
 snake = [[32, 16], [32, 24], [32, 32]]
 food = [random.randint(0, 15)*8, random.randint(0, 7)*8]
+segments = [Sprite(tiles) for _ in range(16 * 8)]  # Пул спрайтов на всё поле
+food_sprite = Sprite(tiles, frame=1)
 direction = 0  # 0=вверх, 1=вправо, 2=вниз, 3=влево
 
 while True:
@@ -39,9 +54,10 @@ while True:
     
     # Отрисовка
     gfx.fill_screen(0)
-    for segment in snake:
-        gfx.rect(segment[0], segment[1], 8, 8, 1, fill=True)
-    gfx.rect(food[0], food[1], 8, 8, 1)
+    for sprite, segment in zip(segments, snake):
+        sprite.x, sprite.y = segment
+    food_sprite.x, food_sprite.y = food
+    gfx.draw_sprites(segments[:len(snake)] + [food_sprite])
     gfx.update()
     time.sleep_ms(200)
 
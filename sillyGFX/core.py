@@ -1,9 +1,11 @@
 from micropython import const
 from time import ticks_us, ticks_diff, sleep_ms
 from random import randint, random
-from math import sin, cos
+from math import sin, cos, pi
+from array import array
 import sillyGFX.fonts, time, uctypes, framebuf, ssd1306
 from sillyGFX.fonts import get_font_5x7
+from sillyGFX.image import read_header as _sgi_header
 from machine import SPI, Pin
 # Константы стилей
 SOLID = const(0)
@@ -14,6 +16,22 @@ DASHED = const(2)
 HORIZONTAL = const(0)
 VERTICAL = const(1)
 DIAGONAL = const(2)
+# Режим заливки: инверсия вместо цвета
+INVERT = const(2)
+# Правила заливки многоугольников
+EVEN_ODD = const(0)
+NON_ZERO = const(1)
+_FP = const(16)  # Бит дробной части при обходе рёбер
+# Дизеринг изображений
+FLOYD_STEINBERG = const(1)
+ATKINSON = const(2)
+BAYER4 = const(3)
+BAYER8 = const(4)
+# Растровые операции вывода bitmap
+COPY = const(0)
+OR = const(1)
+AND = const(2)
+XOR = const(3)
 # Константы выравнивания текста
 LEFT = const(0)
 CENTER = const(1)
@@ -24,53 +42,574 @@ MONO_VLSB = framebuf.MONO_VLSB  # 1-bit монохромный (вертикал
 RGB565 = framebuf.RGB565       # 16-bit цветной
 GS4_HMSB = framebuf.GS4_HMSB   # 4-bit градации серого
 
-class SillyGFX:
-    def __init__(self, width=128, height=64, i2c=None, i2c_addr=0x3C, format=MONO_VLSB):
+# Стили линий как повторяющиеся битовые шаблоны (бит i - i-й пиксель периода)
+_PATTERNS = {DOTTED: (0b01, 2), DASHED: (0b000111, 6)}
+_pattern_cache = {}  # шаблон -> (отрезки "вкл." за период, шаблон с повтором на 8 бит)
+
+def dash_pattern(*runs):
+    """Пользовательский стиль линии: чередующиеся длины "вкл./выкл." в пикселях.
+    dash_pattern(4, 2, 1, 2) -> "----  -  ". Период не длиннее 16 пикселей"""
+    bits = 0
+    length = 0
+    for i, n in enumerate(runs):
+        if i % 2 == 0:
+            bits |= ((1 << n) - 1) << length
+        length += n
+    if not 0 < length <= 16:
+        raise ValueError("Период шаблона должен быть 1..16 пикселей")
+    return bits, length
+
+def _pattern_info(pattern):
+    """Отрезки шаблона и его развёртка для выборки 8 бит с любого смещения"""
+    info = _pattern_cache.get(pattern)
+    if info is None:
+        bits, length = pattern
+        runs = []
+        i = 0
+        while i < length:
+            if bits >> i & 1:
+                start = i
+                while i < length and bits >> i & 1:
+                    i += 1
+                runs.append((start, i - start))
+            else:
+                i += 1
+        ext = bits
+        n = length
+        while n < length + 8:
+            ext |= bits << n
+            n += length
+        info = _pattern_cache[pattern] = (runs, ext)
+    return info
+
+# Таблица разворота битов в байте
+_REV = bytes(int('{:08b}'.format(i)[::-1], 2) for i in range(256))
+
+def _edge_top(e):
+    """Ключ сортировки рёбер многоугольника (без лямбды на каждый вызов)"""
+    return e[0]
+
+def _transpose8(a):
+    """Транспонирование битовой матрицы 8x8 в 8-байтовом буфере на месте:
+    бит r байта k становится битом k байта r"""
+    for i in (0, 1, 2, 3):
+        t = ((a[i] >> 4) ^ a[i + 4]) & 0x0F
+        a[i + 4] ^= t
+        a[i] ^= t << 4
+    for i in (0, 1, 4, 5):
+        t = ((a[i] >> 2) ^ a[i + 2]) & 0x33
+        a[i + 2] ^= t
+        a[i] ^= t << 2
+    for i in (0, 2, 4, 6):
+        t = ((a[i] >> 1) ^ a[i + 1]) & 0x55
+        a[i + 1] ^= t
+        a[i] ^= t << 1
+
+def _transpose(src, w, h):
+    """Транспонирование MONO_VLSB bitmap w x h блоками 8x8 -> bitmap h x w"""
+    dst = bytearray(h * ((w + 7) >> 3))
+    blk = bytearray(8)
+    for page in range((h + 7) >> 3):
+        rows = min(8, h - page * 8)  # Столбцов в результате от этой страницы
+        for bx in range(0, w, 8):
+            base = page * w + bx
+            n = min(8, w - bx)
+            for k in range(8):
+                blk[k] = src[base + k] if k < n else 0
+            _transpose8(blk)
+            # Блок (bx, page) переезжает в (page, bx)
+            dbase = (bx >> 3) * h + page * 8
+            for k in range(rows):
+                dst[dbase + k] = blk[k]
+    return dst
+
+def _flip_x(buf, w, pages):
+    """Зеркалирование MONO_VLSB по X на месте (разворот байтов страниц)"""
+    for base in range(0, pages * w, w):
+        i = base
+        j = base + w - 1
+        while i < j:
+            buf[i], buf[j] = buf[j], buf[i]
+            i += 1
+            j -= 1
+
+def rotate_bitmap(buf, w, h, degrees):
+    """Поворот MONO_VLSB bitmap на 90/180/270 градусов по часовой стрелке.
+    Возвращает (новый буфер, ширина, высота)"""
+    degrees %= 360
+    if degrees == 90:
+        dst = _transpose(buf, w, h)
+        _flip_x(dst, h, (w + 7) >> 3)
+        return dst, h, w
+    if degrees == 270:
+        src = bytearray(buf)
+        _flip_x(src, w, (h + 7) >> 3)
+        return _transpose(src, w, h), h, w
+    if degrees == 180:
+        if h & 7:
+            # Неполная последняя страница: два поворота по 90 без сдвига битов
+            dst, w2, h2 = rotate_bitmap(buf, w, h, 90)
+            return rotate_bitmap(dst, w2, h2, 90)
+        # Разворот всего буфера меняет порядок и страниц, и столбцов
+        n = len(buf)
+        dst = bytearray(n)
+        for i in range(n):
+            dst[n - 1 - i] = _REV[buf[i]]
+        return dst, w, h
+    return bytearray(buf), w, h
+
+def _lsb_rows_to_vlsb(data, w, h):
+    """Bitmap строками (младший бит - левый пиксель, как XBM) -> MONO_VLSB w x h
+    транспонированием блоков 8x8"""
+    stride = (w + 7) >> 3
+    dst = bytearray(w * ((h + 7) >> 3))
+    blk = bytearray(8)
+    for page in range((h + 7) >> 3):
+        for k in range(stride):
+            for r in range(8):
+                row = page * 8 + r
+                blk[r] = data[row * stride + k] if row < h else 0
+            _transpose8(blk)
+            base = page * w + k * 8
+            for j in range(min(8, w - k * 8)):
+                dst[base + j] = blk[j]
+    return dst
+
+def _lsb_rows_to_vlsb_t(data, w, h):
+    """То же, но сразу транспонированное (h x w) для портрета:
+    байт строки становится байтом страницы без перестановки битов"""
+    stride = (w + 7) >> 3
+    tail = (1 << (w & 7)) - 1 if w & 7 else 0xFF  # Биты выравнивания за правым краем
+    last = (stride - 1) * h
+    dst = bytearray(stride * h)
+    for y in range(h):
+        for k in range(stride):
+            dst[k * h + y] = data[y * stride + k]
+        dst[last + y] &= tail
+    return dst
+
+def _bmp_info(f):
+    """Заголовок BMP -> (ширина, высота, бит на пиксель, смещение данных,
+    строки сверху вниз, яркости палитры или None)"""
+    header = f.read(54)
+    if len(header) < 54 or header[0] != 0x42 or header[1] != 0x4D:
+        raise ValueError("не BMP")
+    data_offset = int.from_bytes(header[10:14], 'little')
+    header_size = int.from_bytes(header[14:18], 'little')
+    width = int.from_bytes(header[18:22], 'little')
+    height = int.from_bytes(header[22:26], 'little')
+    bpp = int.from_bytes(header[28:30], 'little')
+    compression = int.from_bytes(header[30:34], 'little')
+    if bpp not in (1, 4, 8, 24, 32) or compression not in (0, 3):
+        raise ValueError("неподдерживаемый формат: %d бит, сжатие %d" % (bpp, compression))
+    top_down = height >= 0x80000000  # Отрицательная высота - строки сверху вниз
+    if top_down:
+        height = 0x100000000 - height
+    
+    palette = None
+    if bpp <= 8:
+        colors = int.from_bytes(header[46:50], 'little') or 1 << bpp
+        f.seek(14 + header_size)
+        raw = f.read(4 * colors)
+        # Целочисленная яркость: (77*R + 150*G + 29*B) / 256
+        palette = bytearray(256)
+        for i in range(len(raw) // 4):
+            palette[i] = (77 * raw[4 * i + 2] + 150 * raw[4 * i + 1] + 29 * raw[4 * i]) >> 8
+    return width, height, bpp, data_offset, top_down, palette
+
+def _bmp_row(row, bpp, lut, c0, cw, out):
+    """Столбцы c0..c0+cw строки BMP -> out через таблицу lut
+    (по индексу палитры или по яркости для 24/32 бит)"""
+    if bpp == 8:
+        for i in range(cw):
+            out[i] = lut[row[c0 + i]]
+    elif bpp >= 24:
+        n = bpp >> 3
+        o = c0 * n
+        for i in range(cw):
+            out[i] = lut[(77 * row[o + 2] + 150 * row[o + 1] + 29 * row[o]) >> 8]
+            o += n
+    elif bpp == 4:
+        for i in range(cw):
+            c = c0 + i
+            out[i] = lut[row[c >> 1] >> (0 if c & 1 else 4) & 0x0F]
+    else:
+        for i in range(cw):
+            c = c0 + i
+            out[i] = lut[row[c >> 3] >> (7 - (c & 7)) & 1]
+
+def _bayer(n):
+    """Пороги упорядоченного дизеринга n x n (n - степень двойки), 0..255"""
+    m = [0]
+    size = 1
+    while size < n:
+        # M(2n) = [[4M, 4M+2], [4M+3, 4M+1]]
+        s2 = 2 * size
+        nm = [0] * (s2 * s2)
+        for yy in range(size):
+            for xx in range(size):
+                v = 4 * m[yy * size + xx]
+                nm[yy * s2 + xx] = v
+                nm[yy * s2 + xx + size] = v + 2
+                nm[(yy + size) * s2 + xx] = v + 3
+                nm[(yy + size) * s2 + xx + size] = v + 1
+        m = nm
+        size = s2
+    return bytes((2 * v + 1) * 128 // (n * n) for v in m)
+
+class Dither:
+    """Потоковый дизеринг: строки яркостей 0..255 по очереди -> 0/1 на месте.
+    Рассеивание ошибки хранит только целочисленные буферы строк
+    (две для Флойда-Стейнберга, три для Аткинсона)"""
+    def __init__(self, width, mode=FLOYD_STEINBERG, threshold=128):
         self.width = width
-        self.height = height
+        self.mode = mode
+        self.threshold = threshold
+        self.y = 0
+        if mode == BAYER4 or mode == BAYER8:
+            n = 4 if mode == BAYER4 else 8
+            bias = threshold - 128
+            self._matrix = bytes(min(255, max(0, t + bias)) for t in _bayer(n))
+            self._n = n
+        else:
+            # Ошибка пикселя x хранится в ячейке x + 1 (края не проверяем)
+            rows = 3 if mode == ATKINSON else 2
+            self._err = [array('h', bytes(2 * (width + 3))) for _ in range(rows)]
+
+    def row(self, values, y=None):
+        """Преобразует строку values[0:width] в 0/1. y - номер строки для
+        упорядоченного дизеринга (по умолчанию считаются по порядку)"""
+        if y is None:
+            y = self.y
+        self.y = y + 1
+        n = self.width
+        t = self.threshold
+        if self.mode == BAYER4 or self.mode == BAYER8:
+            size = self._n
+            m = self._matrix
+            base = (y & (size - 1)) * size
+            mask = size - 1
+            for x in range(n):
+                values[x] = 1 if values[x] > m[base + (x & mask)] else 0
+            return values
+        
+        err = self._err
+        cur = err[0]
+        nxt = err[1]
+        if self.mode == ATKINSON:
+            nxt2 = err[2]
+            for x in range(n):
+                v = values[x] + cur[x + 1]
+                cur[x + 1] = 0
+                if v > t:
+                    values[x] = 1
+                    e = (v - 255) >> 3
+                else:
+                    values[x] = 0
+                    e = v >> 3
+                # 6/8 ошибки: два вправо, три снизу, один через строку
+                cur[x + 2] += e
+                cur[x + 3] += e
+                nxt[x] += e
+                nxt[x + 1] += e
+                nxt[x + 2] += e
+                nxt2[x + 1] += e
+            err[0], err[1], err[2] = nxt, nxt2, cur
+        else:
+            for x in range(n):
+                v = values[x] + (cur[x + 1] >> 4)  # Ошибка хранится x16
+                cur[x + 1] = 0
+                if v > t:
+                    values[x] = 1
+                    e = v - 255
+                else:
+                    values[x] = 0
+                    e = v
+                cur[x + 2] += 7 * e
+                nxt[x] += 3 * e
+                nxt[x + 1] += 5 * e
+                nxt[x + 2] += e
+            err[0], err[1] = nxt, cur
+        # Ячейки за краями строки не читаются - обнуляем перед повторным использованием
+        cur[0] = cur[n + 1] = cur[n + 2] = 0
+        return values
+
+class _TransposedFB:
+    """Вид на FrameBuffer с переставленными осями X и Y (портретная ориентация).
+    blit() ожидает уже транспонированный источник"""
+    def __init__(self, fb):
+        self.fb = fb
+    
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return self.fb.pixel(y, x)
+        self.fb.pixel(y, x, c)
+    
+    def fill(self, c):
+        self.fb.fill(c)
+    
+    def fill_rect(self, x, y, w, h, c):
+        self.fb.fill_rect(y, x, h, w, c)
+    
+    def hline(self, x, y, w, c):
+        self.fb.vline(y, x, w, c)
+    
+    def vline(self, x, y, h, c):
+        self.fb.hline(y, x, h, c)
+    
+    def line(self, x0, y0, x1, y1, c):
+        self.fb.line(y0, x0, y1, x1, c)
+    
+    def rect(self, x, y, w, h, c, f=False):
+        self.fb.rect(y, x, h, w, c, f)
+    
+    def scroll(self, dx, dy):
+        self.fb.scroll(dy, dx)
+    
+    def blit(self, src, x, y, key=-1, palette=None):
+        self.fb.blit(src, y, x, key, palette)
+
+class SillyGFX:
+    def __init__(self, width=128, height=64, i2c=None, i2c_addr=0x3C, format=MONO_VLSB,
+                 i2c_chunk=0, double_buffer=False,
+                 spi=None, dc=None, cs=None, res=None, spi_burst=True, orientation=0):
+        # width/height - логический холст, _pw/_ph - физическая матрица
+        self.width = self._pw = width
+        self.height = self._ph = height
         self.format = framebuf.MONO_VLSB  # Обязательно для SSD1306!
         self.buffer = bytearray((width * height + 7) // 8)
-        self.fb = framebuf.FrameBuffer(self.buffer, width, height, self.format)
+        self._pfb = framebuf.FrameBuffer(self.buffer, width, height, self.format)
+        self.fb = self._pfb  # Логический вид (в портрете оси переставлены)
+        self.orientation = 0
+        self._swap_xy = False
+        # Готовые строки байтов для заливки целых страниц
+        self._ones = memoryview(bytearray(b'\xff' * width))
+        self._zeros = memoryview(bytearray(width))
+        self._row = memoryview(bytearray(width))  # Буфер строки страницы (срезы могут перекрываться)
+        self._tri = array('h', bytes(12))  # Вершины треугольника без аллокаций
+        self._active = []  # Активные рёбра fill_polygon (список переиспользуется)
+        self._conics = {}  # Кэш таблиц окружностей/эллипсов по радиусам
+        self._glyphs = {}  # LRU готовых глифов: ключ -> [FrameBuffer, отметка]
+        self._glyph_tick = 0
+        self._images = {}  # Загруженные .sgi: (имя файла, портрет) -> (FrameBuffer, w, h)
+        self._bitmaps = {}  # Скомпилированные bitmap (только неизменяемые bytes)
+        self._xbm_files = {}  # Разобранные .xbm файлы
+        self._inv = None
+        # Грязная область (включительно): при старте весь экран нужно отправить
+        self._clean()
+        self.mark_dirty()
+        self.tx_bytes = 0  # Байт передано последним update()
+        self._plans = {}   # Кэш планов отправки окон (срезы буфера)
+        
+        # Второй буфер - копия содержимого экрана для передачи разницы
+        self.back_buffer = None
+        if double_buffer:
+            self._init_back_buffer()
         
         if i2c:
-            self.init_i2c(i2c, i2c_addr)
-    
-    def init_i2c(self, i2c, addr=0x3C):
-        """Инициализация I2C дисплея"""
-        self.i2c = i2c
-        self.i2c_addr = addr
+            self.init_i2c(i2c, i2c_addr, i2c_chunk)
+        elif spi:
+            self.init_spi(spi, dc, cs, res, spi_burst)
         
-        # Команды инициализации SSD1306
-        init_seq = bytearray([
+        if orientation:
+            self.set_orientation(orientation)
+    
+    def _init_seq(self, addressing=0x00):
+        """Команды инициализации SSD1306 (addressing: 0x00 - горизонтальная, 0x02 - страничная)"""
+        return bytearray([
             0xAE, 0xD5, 0x80, 0xA8, 0x3F, 0xD3, 0x00, 0x40,
-            0x8D, 0x14, 0x20, 0x00, 0xA1, 0xC8, 0xDA, 0x12,
+            0x8D, 0x14, 0x20, addressing, 0xA1, 0xC8, 0xDA, 0x12,
             0x81, 0xCF, 0xD9, 0xF1, 0xDB, 0x40, 0xA4, 0xA6,
             0xAF
         ])
+    
+    def init_i2c(self, i2c, addr=0x3C, chunk=0):
+        """Инициализация I2C дисплея (chunk - макс. байт данных за транзакцию, 0 - без ограничения)"""
+        self.i2c = i2c
+        self.i2c_addr = addr
+        self.i2c_chunk = chunk
+        # Заранее выделенные буферы команд - отправка кадра без аллокаций
+        self._cmd = bytearray(2)
+        self._win = bytearray(b'\x00\x21\x00\x7F\x22\x00\x07')
+        self._plans.clear()
+        self._send_window = self._update_i2c
+        self._write_cmds = self._i2c_cmds
         
         # Отправка команд
-        for cmd in init_seq:
+        for cmd in self._init_seq():
             self._i2c_write(0x00, cmd)
             time.sleep_ms(1)
     
+    def init_spi(self, spi, dc, cs=None, res=None, burst=True):
+        """Инициализация SPI дисплея.
+        burst=True - весь кадр одной посылкой в горизонтальной адресации,
+        burst=False - постранично (страничная адресация 0xB0..0xB7)"""
+        self.spi = spi
+        self.dc_pin = dc
+        self.cs_pin = cs
+        self.spi_burst = burst
+        dc.init(dc.OUT, value=0)
+        if cs:
+            cs.init(cs.OUT, value=1)
+        if res:
+            # Аппаратный сброс контроллера
+            res.init(res.OUT, value=1)
+            time.sleep_ms(1)
+            res.value(0)
+            time.sleep_ms(10)
+            res.value(1)
+        
+        # Команды окна и страниц строятся один раз
+        self._spi_win = bytearray(b'\x21\x00\x7F\x22\x00\x07')
+        self._page_cmds = [bytearray((0xB0 | page, 0x00, 0x10))
+                           for page in range(self._ph >> 3)]
+        self._plans.clear()
+        self._send_window = self._update_spi
+        self._write_cmds = self._spi_cmds
+        
+        self._spi_cmds(self._init_seq(0x00 if burst else 0x02))
+    
+    def _i2c_cmds(self, cmds):
+        """Пачка команд по I2C одной транзакцией"""
+        self.i2c.writevto(self.i2c_addr, (b'\x00', cmds))
+    
+    def _spi_cmds(self, cmds):
+        """Пачка команд по SPI (DC=0)"""
+        cs = self.cs_pin
+        self.dc_pin.value(0)
+        if cs: cs.value(0)
+        self.spi.write(cmds)
+        if cs: cs.value(1)
+    
     def _i2c_write(self, reg, data):
         """Запись в I2C"""
-        self.i2c.writeto(self.i2c_addr, bytearray([reg, data]))
+        self._cmd[0] = reg
+        self._cmd[1] = data
+        self.i2c.writeto(self.i2c_addr, self._cmd)
     
-    def update(self):
-        """Ультра-надёжное обновление экрана"""
+    # --- ГРЯЗНАЯ ОБЛАСТЬ ---
+    def mark_dirty(self, x=0, y=0, w=None, h=None):
+        """Пометить область как изменённую (по умолчанию весь экран).
+        Нужно вызывать после прямой записи в self.buffer или self.fb"""
+        w = w if w is not None else self.width
+        h = h if h is not None else self.height
+        self._mark(x, y, x + w - 1, y + h - 1)
+
+    def _mark(self, x0, y0, x1, y1):
+        """Расширение грязной области (логические координаты включительно)"""
+        if self._swap_xy:
+            x0, y0 = y0, x0
+            x1, y1 = y1, x1
+        if x0 < 0: x0 = 0
+        if y0 < 0: y0 = 0
+        if x1 >= self._pw: x1 = self._pw - 1
+        if y1 >= self._ph: y1 = self._ph - 1
+        if x0 > x1 or y0 > y1:
+            return  # Полностью за экраном
+        if x0 < self._dx0: self._dx0 = x0
+        if y0 < self._dy0: self._dy0 = y0
+        if x1 > self._dx1: self._dx1 = x1
+        if y1 > self._dy1: self._dy1 = y1
+
+    def _clean(self):
+        """Сброс грязной области после отправки"""
+        self._dx0 = self._pw
+        self._dy0 = self._ph
+        self._dx1 = -1
+        self._dy1 = -1
+
+    def dirty_rect(self):
+        """Текущая грязная область в координатах матрицы (x, y, w, h) или None"""
+        if self._dx1 < 0:
+            return None
+        return (self._dx0, self._dy0,
+                self._dx1 - self._dx0 + 1, self._dy1 - self._dy0 + 1)
+
+    def update(self, full=False):
+        """Отправка на экран только изменённой области (full=True - весь кадр).
+        Возвращает число переданных байт"""
+        return self._present(full, True)
+
+    def _present(self, full, sync):
+        """Отправка грязной области; sync - обновить копию экрана в back_buffer"""
+        if full:
+            self.mark_dirty()
+        if self._dx1 < 0:
+            self.tx_bytes = 0
+            return 0  # Ничего не менялось
+        
+        sent = 0
         try:
-            # 1. Установка области вывода (командный режим: 0x00)
-            self.i2c.writeto(self.i2c_addr, b'\x00\x21\x00\x7F')  # Все столбцы (0-127)
-            self.i2c.writeto(self.i2c_addr, b'\x00\x22\x00\x07')  # Все страницы (0-7)
-            
-            # 2. Отправка данных (режим данных: 0x40)
-            self.i2c.writeto(self.i2c_addr, b'\x40' + self.buffer)
+            if self.back_buffer is not None and self._synced and not full:
+                # Двойная буферизация: только реально изменённые участки
+                sent = self._update_diff(sync)
+            else:
+                sent = self._send_window(self._dx0, self._dx1,
+                                         self._dy0 >> 3, self._dy1 >> 3)
+                if self.back_buffer is not None and sync:
+                    self.back_buffer[:] = self.buffer
+                    self._synced = True
+            self._clean()
             
         except Exception as e:
             print("Ошибка обновления:", e)
             # Аварийный сброс
             self.reset_display()  
+        
+        self.tx_bytes = sent
+        return sent
+
+    # --- ДВОЙНАЯ БУФЕРИЗАЦИЯ ---
+    def _init_back_buffer(self):
+        """Выделение второго буфера (копия того, что сейчас на экране)"""
+        self.back_buffer = bytearray(len(self.buffer))
+        self.back_fb = framebuf.FrameBuffer(self.back_buffer, self._pw,
+                                            self._ph, self.format)
+        self._synced = False  # Содержимое экрана пока неизвестно
+        self.mark_dirty()
+
+    def _update_diff(self, sync):
+        """Сравнение буферов группами по 8 столбцов внутри каждой страницы
+        и отправка только изменённых участков"""
+        buf = self.buffer
+        back = self.back_buffer
+        w = self._pw
+        x0 = self._dx0 & ~7
+        x1 = self._dx1
+        sent = 0
+        
+        for page in range(self._dy0 >> 3, (self._dy1 >> 3) + 1):
+            base = page * w
+            run_start = -1
+            run_end = 0
+            for g in range(x0, x1 + 1, 8):
+                g_end = min(g + 8, w)
+                for i in range(base + g, base + g_end):
+                    if buf[i] != back[i]:
+                        break
+                else:
+                    continue  # Группа не изменилась
+                
+                if run_start < 0:
+                    run_start = g
+                elif g - run_end > 8:
+                    # Разрыв длиннее накладных расходов на новое окно
+                    sent += self._send_run(page, run_start, run_end, sync)
+                    run_start = g
+                run_end = g_end
+            
+            if run_start >= 0:
+                sent += self._send_run(page, run_start, run_end, sync)
+        return sent
+
+    def _send_run(self, page, start, end, sync):
+        """Отправка столбцов start..end-1 одной страницы"""
+        sent = self._send_window(start, end - 1, page, page, False)
+        if sync:
+            base = page * self._pw
+            memoryview(self.back_buffer)[base + start:base + end] = \
+                memoryview(self.buffer)[base + start:base + end]
+        return sent
 
 
     def _fallback_update(self, x=0, y=0, w=None, h=None):
@@ -88,34 +627,139 @@ class SillyGFX:
                 self.display.pixel(xx, yy, bit)
             
     def swap_buffers(self):
-        """Безопасное переключение буферов"""
+        """Показ кадра и обмен буферов (для циклов с полной перерисовкой).
+        После обмена рисование идёт поверх предпоследнего кадра"""
+        if self.back_buffer is None:
+            self._init_back_buffer()
+        sent = self._present(False, False)
+        
+        # Отправленный кадр уже на экране - копировать его не нужно
         self.buffer, self.back_buffer = self.back_buffer, self.buffer
-        self.update()
+        self._pfb, self.back_fb = self.back_fb, self._pfb
+        self.fb = _TransposedFB(self._pfb) if self._swap_xy else self._pfb
+        self._synced = True
+        self._plans.clear()  # Планы отправки ссылались на старый буфер
+        self.mark_dirty()  # Новый буфер расходится с экраном где угодно
+        return sent
     
-    def _update_spi(self):
-        """Исправленная версия для SSD1306"""
-        self.dc_pin.value(1)
-        self.cs_pin.value(0)
-        
-        # Для SSD1306 отправляем данные страницами по 8 строк
-        for page in range(0, self.height // 8):
-            # Устанавливаем текущую страницу (команда 0xB0..0xB7)
-            self.dc_pin.value(0)
-            self.spi.write(bytearray([0xB0 | page, 0x00, 0x10]))
-            self.dc_pin.value(1)
-            
-            # Отправляем строку из буфера
-            start = page * self.width
-            end = start + self.width
-            self.spi.write(self.buffer[start:end])
+    def _update_spi(self, x0=0, x1=None, p0=0, p1=None, cache=True):
+        """Отправка окна по SPI без копий буфера. Возвращает число переданных байт"""
+        if x1 is None: x1 = self._pw - 1
+        if p1 is None: p1 = (self._ph >> 3) - 1
+        dc = self.dc_pin
+        cs = self.cs_pin
+        plan = self._spi_plan(x0, x1, p0, p1, cache)
+        if cs: cs.value(0)
+        
+        if self.spi_burst:
+            # Одно окно и все данные подряд: DC переключается дважды за кадр
+            win = self._spi_win
+            win[1] = x0
+            win[2] = x1
+            win[4] = p0
+            win[5] = p1
+            dc.value(0)
+            self.spi.write(win)
+            dc.value(1)
+            for view in plan:
+                self.spi.write(view)
+            sent = 6
+        else:
+            # Страничная адресация: заранее собранные команды 0xB0|page
+            for page in range(p0, p1 + 1):
+                cmd = self._page_cmds[page]
+                cmd[1] = x0 & 0x0F
+                cmd[2] = 0x10 | (x0 >> 4)
+                dc.value(0)
+                self.spi.write(cmd)
+                dc.value(1)
+                self.spi.write(plan[page - p0])
+            sent = 3 * (p1 - p0 + 1)
+        
+        if cs: cs.value(1)
+        return sent + (x1 - x0 + 1) * (p1 - p0 + 1)
+
+    def _spi_plan(self, x0, x1, p0, p1, cache=True):
+        """Кэшируемые memoryview-срезы окна (по одному на страницу или один на всё)"""
+        key = x0 | (x1 << 8) | (p0 << 16) | (p1 << 20)
+        if cache:
+            plan = self._plans.get(key)
+            if plan is not None:
+                return plan
+            if len(self._plans) >= 8:
+                self._plans.clear()
+        
+        w = self._pw
+        mv = memoryview(self.buffer)
+        if self.spi_burst and x0 == 0 and x1 == w - 1:
+            plan = [mv[p0 * w:(p1 + 1) * w]]  # Весь кадр одной посылкой
+        else:
+            plan = [mv[p * w + x0:p * w + x1 + 1] for p in range(p0, p1 + 1)]
         
-        self.cs_pin.value(1)
+        if cache:
+            self._plans[key] = plan
+        return plan
     
-    def _update_i2c(self):
-        """Оптимизированный I2C с пачковой отправкой"""
-        buf = bytearray([0x40]) + self.buffer  # 0x40 = Co=0, D/C=1 (данные)
-        for i in range(0, len(buf), 32):  # Отправляем по 32 байта (макс. для I2C)
-            self.i2c.writeto(self.i2c_addr, buf[i:i+32])
+    def _update_i2c(self, x0=0, x1=None, p0=0, p1=None, cache=True):
+        """Отправка окна столбцов x0..x1 и страниц p0..p1 без аллокаций.
+        Возвращает число переданных байт"""
+        if x1 is None: x1 = self._pw - 1
+        if p1 is None: p1 = (self._ph >> 3) - 1
+        
+        # 1. Окно вывода одной транзакцией (командный режим: 0x00)
+        win = self._win
+        win[2] = x0
+        win[3] = x1
+        win[5] = p0
+        win[6] = p1
+        self.i2c.writeto(self.i2c_addr, win)
+        
+        # 2. Данные: готовые наборы memoryview, writevto склеивает их сам
+        plan = self._i2c_plan(x0, x1, p0, p1, cache)
+        for chunk in plan:
+            self.i2c.writevto(self.i2c_addr, chunk)
+        return 7 + (x1 - x0 + 1) * (p1 - p0 + 1) + len(plan)
+
+    def _i2c_plan(self, x0, x1, p0, p1, cache=True):
+        """Кэшируемый план отправки окна: кортежи (0x40, срезы буфера...)"""
+        key = x0 | (x1 << 8) | (p0 << 16) | (p1 << 20)  # int-ключ не аллоцирует
+        if cache:
+            plan = self._plans.get(key)
+            if plan is not None:
+                return plan
+            if len(self._plans) >= 8:
+                self._plans.clear()  # Держим кэш маленьким
+        
+        w = self._pw
+        mv = memoryview(self.buffer)
+        if x0 == 0 and x1 == w - 1:
+            # Полная ширина - страницы лежат в буфере подряд
+            segments = ((p0 * w, (p1 + 1) * w),)
+        else:
+            # Внутри окна указатель GDDRAM сам переходит на следующую страницу
+            segments = [(p * w + x0, p * w + x1 + 1) for p in range(p0, p1 + 1)]
+        
+        # Нарезка на транзакции не длиннее chunk байт (0x40 = Co=0, D/C=1 - данные)
+        limit = self.i2c_chunk or len(self.buffer)
+        plan = []
+        parts = [b'\x40']
+        room = limit
+        for start, end in segments:
+            while start < end:
+                n = min(end - start, room)
+                parts.append(mv[start:start + n])
+                start += n
+                room -= n
+                if room == 0:
+                    plan.append(tuple(parts))
+                    parts = [b'\x40']
+                    room = limit
+        if len(parts) > 1:
+            plan.append(tuple(parts))
+        
+        if cache:
+            self._plans[key] = plan
+        return plan
 
     # --- БАЗОВЫЕ МЕТОДЫ ---
     def _safety_net(self):
@@ -128,294 +772,1163 @@ class SillyGFX:
     def fill_screen(self, color=0):
         """Заливка экрана"""
         self.fb.fill(color)
+        self.mark_dirty()
         
     def fill_area(self, x, y, w, h, color=1):
         """Оптимизированная заливка прямоугольной области"""
-        x_end = min(x + w, self.width)
-        y_end = min(y + h, self.height)
+        self.fill_rect(x, y, w, h, color)
+
+    def fill_rect(self, x, y, w, h, color=1):
+        """Заливка прямоугольника целыми байтами страниц (color: 0, 1 или INVERT)"""
+        # Отсечение по логическому холсту
+        if x < 0:
+            w += x
+            x = 0
+        if y < 0:
+            h += y
+            y = 0
+        if x + w > self.width: w = self.width - x
+        if y + h > self.height: h = self.height - y
+        if w <= 0 or h <= 0:
+            return
+        
+        self._mark(x, y, x + w - 1, y + h - 1)
+        if self._swap_xy:
+            x, y = y, x
+            w, h = h, w
+        self._span_fill(x, y, w, h, color)
+
+    def _span_fill(self, x, y, w, h, mode):
+        """Ядро заливки в координатах матрицы (область уже отсечена).
+        Целые страницы - копированием готовой строки байтов,
+        неполные верхняя/нижняя - по маскам head/tail"""
+        buf = self.buffer
+        W = self._pw
+        y1 = y + h - 1
+        p0 = y >> 3
+        p1 = y1 >> 3
+        head = (0xFF << (y & 7)) & 0xFF
+        tail = 0xFF >> (7 - (y1 & 7))
         
-        for yy in range(max(y, 0), y_end):
-            self.hline(max(x, 0), yy, x_end - max(x, 0), color)
+        for page in range(p0, p1 + 1):
+            mask = 0xFF
+            if page == p0: mask &= head
+            if page == p1: mask &= tail
+            start = page * W + x
+            
+            if mode == INVERT:
+                for i in range(start, start + w):
+                    buf[i] ^= mask
+            elif mask == 0xFF:
+                memoryview(buf)[start:start + w] = (self._ones if mode else self._zeros)[:w]
+            else:
+                # Неполная страница: fill_rect framebuf делает то же самое на C
+                top = y if page == p0 else page * 8
+                bottom = y1 if page == p1 else page * 8 + 7
+                self._pfb.fill_rect(x, top, w, bottom - top + 1, mode)
             
     def gradient_fill(self, color_start=0, color_end=1):
         """Вертикальный градиент (для будущей цветной версии)"""
-        for y in range(self.height):
-            ratio = y / self.height
-            color = color_start if ratio < 0.5 else color_end
-            self.hline(0, y, self.width, color)
+        half = (self.height + 1) // 2
+        self.fill_rect(0, 0, self.width, half, color_start)
+        self.fill_rect(0, half, self.width, self.height - half, color_end)
         
     def clear(self):
         """Очистка экрана (алиас для fill_screen)"""
         self.fill_screen(0)
     
     def scroll(self, dx, dy):
-        """Прокрутка содержимого буфера"""
-        new_buffer = bytearray(len(self.buffer))
-        for y in range(self.height):
-            for x in range(self.width):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.width and 0 <= ny < self.height:
-                    if self.pixel(x, y):
-                        new_buffer[(ny // 8) * self.width + nx] ^= (1 << (ny % 8))
-        self.buffer = new_buffer
+        """Прокрутка содержимого буфера на месте (освободившееся место очищается)"""
+        if self._swap_xy:
+            dx, dy = dy, dx
+        if dx:
+            self._scroll_h(dx)
+        if dy:
+            self._scroll_v(dy)
+        self.mark_dirty()
+
+    def _scroll_h(self, dx):
+        """Сдвиг по X: в MONO_VLSB это сдвиг байтов внутри каждой страницы"""
+        w = self._pw
+        if dx >= w or -dx >= w:
+            self._pfb.fill(0)
+            return
+        
+        mv = memoryview(self.buffer)
+        row = self._row
+        n = w - abs(dx)
+        src = 0 if dx > 0 else -dx
+        dst = dx if dx > 0 else 0
+        for base in range(0, (self._ph >> 3) * w, w):
+            row[:n] = mv[base + src:base + src + n]
+            mv[base + dst:base + dst + n] = row[:n]
+        
+        # Очистка освободившейся полосы
+        self._pfb.fill_rect(0 if dx > 0 else n, 0, abs(dx), self._ph, 0)
+
+    def _scroll_v(self, dy):
+        """Сдвиг по Y всего буфера"""
+        self._shift_v(dy, 0, self._pw)
+
+    def _shift_v(self, dy, x0, x1, mask=None, fill=0):
+        """Сдвиг физических столбцов x0..x1-1 по Y: целые страницы переносятся,
+        остаток - сдвигом битов с переносом между страницами.
+        mask[i] == 0 оставляет столбец x0 + i на месте, fill - цвет освободившихся строк"""
+        w = self._pw
+        pages = self._ph >> 3
+        buf = self.buffer
+        fb = 0xFF if fill else 0
+        if dy >= self._ph or -dy >= self._ph:
+            dy = self._ph if dy > 0 else -self._ph  # Всё уезжает за край: остаются строки fill
+        q = abs(dy) >> 3  # Целых страниц
+        r = abs(dy) & 7   # Остаток в битах
+        carry = 8 - r
+        
+        if mask is None and x0 == 0 and x1 == w:
+            # Весь экран: страницы переносятся memoryview, затем общий проход по битам
+            mv = memoryview(buf)
+            if q:
+                if dy > 0:
+                    for page in range(pages - 1, q - 1, -1):
+                        mv[page * w:(page + 1) * w] = mv[(page - q) * w:(page - q + 1) * w]
+                    self._pfb.fill_rect(0, 0, w, min(q * 8, self._ph), fill)
+                else:
+                    for page in range(pages - q):
+                        mv[page * w:(page + 1) * w] = mv[(page + q) * w:(page + q + 1) * w]
+                    self._pfb.fill_rect(0, (pages - q) * 8, w, q * 8, fill)
+            if r:
+                lo = fb >> carry  # Биты, вдвигаемые с края
+                if dy > 0:
+                    # Вниз: старшие биты верхней страницы переходят в младшие нижней
+                    for i in range((pages - 1) * w - 1, -1, -1):
+                        j = i + w
+                        buf[j] = ((buf[j] << r) | (buf[i] >> carry)) & 0xFF
+                    for i in range(w):
+                        buf[i] = ((buf[i] << r) & 0xFF) | lo
+                else:
+                    # Вверх: младшие биты нижней страницы переходят в старшие верхней
+                    hi = (fb << carry) & 0xFF
+                    for i in range((pages - 1) * w):
+                        buf[i] = (buf[i] >> r) | ((buf[i + w] << carry) & 0xFF)
+                    for i in range((pages - 1) * w, pages * w):
+                        buf[i] = (buf[i] >> r) | hi
+            return
+        
+        # Отдельные столбцы: страница p собирается из страниц p-q и p-q-1 (вниз)
+        # или p+q и p+q+1 (вверх); за краем - байт fill
+        for x in range(max(0, x0), min(w, x1)):
+            if mask is not None and not mask[x - x0]:
+                continue
+            if dy > 0:
+                for p in range(pages - 1, -1, -1):
+                    s = p - q
+                    a = buf[s * w + x] if s >= 0 else fb
+                    b = buf[(s - 1) * w + x] if s >= 1 else fb
+                    buf[p * w + x] = ((a << r) | (b >> carry)) & 0xFF
+            else:
+                for p in range(pages):
+                    s = p + q
+                    a = buf[s * w + x] if s < pages else fb
+                    b = buf[(s + 1) * w + x] if s + 1 < pages else fb
+                    buf[p * w + x] = (a >> r) | ((b << carry) & 0xFF)
+
+    def _shift_h(self, dx, y0, y1, fill=0):
+        """Сдвиг физических строк y0..y1-1 по X. Целые страницы - перенос байтов,
+        частично задетые - смешивание по маске строк"""
+        w = self._pw
+        y0 = max(0, y0)
+        y1 = min(self._ph, y1)
+        if y0 == 0 and y1 == self._ph and not fill:
+            self._scroll_h(dx)
+            return
+        buf = self.buffer
+        n = w - abs(dx)
+        for page in range(y0 >> 3, (y1 + 7) >> 3):
+            # Маска строк полосы внутри страницы
+            m = 0xFF
+            if page == y0 >> 3:
+                m &= 0xFF << (y0 & 7)
+            if page == (y1 - 1) >> 3:
+                m &= 0xFF >> (7 - ((y1 - 1) & 7))
+            m &= 0xFF
+            keep = ~m & 0xFF
+            fb = m if fill else 0
+            base = page * w
+            if dx > 0:
+                for x in range(w - 1, -1, -1):
+                    v = buf[base + x - dx] if x >= dx else fb
+                    buf[base + x] = (buf[base + x] & keep) | (v & m)
+            else:
+                for x in range(w):
+                    v = buf[base + x - dx] if x < n else fb
+                    buf[base + x] = (buf[base + x] & keep) | (v & m)
+
+    def shift_columns(self, dy, x=0, w=None, mask=None, fill=0):
+        """Побитовый сдвиг столбцов x..x+w-1 по вертикали на dy (вниз > 0).
+        В MONO_VLSB это сдвиг влево с переносом между страницами - без fb.pixel.
+        mask - необязательные флаги по столбцам (0 - столбец стоит), fill - цвет
+        вдвигаемых строк. Основа для дождя, снега, падающего песка"""
+        if w is None:
+            w = self.width - x
+        if not dy or w <= 0:
+            return
+        if self._swap_xy:
+            # Портрет: логические столбцы - физические строки
+            if mask is None:
+                self._shift_h(dy, x, x + w, fill)
+            else:
+                for i in range(w):
+                    if mask[i]:
+                        self._shift_h(dy, x + i, x + i + 1, fill)
+        else:
+            self._shift_v(dy, x, x + w, mask, fill)
+        self._mark(x, 0, x + w - 1, self.height - 1)
+
+    def shift_rows(self, dx, y=0, h=None, fill=0):
+        """Побитовый сдвиг строк y..y+h-1 по горизонтали на dx (вправо > 0),
+        например прокрутка графика: shift_rows(-1, y, h) и новая точка справа"""
+        if h is None:
+            h = self.height - y
+        if not dx or h <= 0:
+            return
+        if self._swap_xy:
+            self._shift_v(dx, y, y + h, None, fill)
+        else:
+            self._shift_h(dx, y, y + h, fill)
+        self._mark(0, y, self.width - 1, y + h - 1)
+
+    # --- АППАРАТНАЯ ПРОКРУТКА SSD1306 ---
+    def hw_scroll(self, direction=LEFT, start_page=0, end_page=None, interval=7, vertical=0):
+        """Непрерывная прокрутка силами контроллера (CPU не тратится).
+        direction: LEFT/RIGHT, interval: код скорости 0..7 (7 - 2 кадра, самый быстрый),
+        vertical: смещение строк за шаг (0 - только горизонтально)"""
+        if end_page is None:
+            end_page = (self._ph >> 3) - 1
+        self._write_cmds(b'\x2E')  # Менять параметры можно только после остановки
+        if vertical:
+            # 0x29/0x2A: вертикальная + горизонтальная, область 0xA3 - весь экран
+            cmd = 0x2A if direction == LEFT else 0x29
+            self._write_cmds(bytes((0xA3, 0x00, self._ph,
+                                    cmd, 0x00, start_page, interval, end_page,
+                                    vertical % self._ph, 0x2F)))
+        else:
+            # 0x26/0x27: только горизонтальная
+            cmd = 0x27 if direction == LEFT else 0x26
+            self._write_cmds(bytes((cmd, 0x00, start_page, interval, end_page,
+                                    0x00, 0xFF, 0x2F)))
+
+    def hw_scroll_stop(self):
+        """Остановка аппаратной прокрутки.
+        Контроллер портит GDDRAM при прокрутке, поэтому следующий update() шлёт весь кадр"""
+        self._write_cmds(b'\x2E')
+        self._synced = False
+        self.mark_dirty()
 
     def rotate(self, degrees):
-        """Поворот буфера на 90/180/270 градусов"""
-        # Реализация поворота
-        pass
+        """Поворот буфера на 90/180/270 градусов по часовой стрелке.
+        Для неквадратного экрана при 90/270 поворачивается центральный квадрат"""
+        degrees %= 360
+        if not degrees:
+            return
+        if self._swap_xy:
+            degrees = 360 - degrees  # Транспонирование меняет направление поворота
+        
+        w = self._pw
+        pages = self._ph >> 3
+        buf = self.buffer
+        if degrees == 180:
+            # Разворот всего буфера на месте + разворот битов
+            i = 0
+            j = w * pages - 1
+            while i < j:
+                buf[i], buf[j] = _REV[buf[j]], _REV[buf[i]]
+                i += 1
+                j -= 1
+            if i == j:
+                buf[i] = _REV[buf[i]]
+        else:
+            # Вырезаем квадрат по центру, поворачиваем блоками 8x8 и кладём обратно
+            size = min(w, pages * 8) & ~7
+            sp = size >> 3
+            ox = (w - size) >> 1
+            op = (pages - sp) >> 1
+            mv = memoryview(buf)
+            square = bytearray(size * sp)
+            for page in range(sp):
+                start = (op + page) * w + ox
+                square[page * size:(page + 1) * size] = mv[start:start + size]
+            square = rotate_bitmap(square, size, size, degrees)[0]
+            self._pfb.fill(0)
+            for page in range(sp):
+                start = (op + page) * w + ox
+                mv[start:start + size] = square[page * size:(page + 1) * size]
+        self.mark_dirty()
+
+    def set_orientation(self, degrees):
+        """Постоянная ориентация экрана: 0/180 - аппаратно (переворот сегментов и COM),
+        90/270 - аппаратное отражение + перестановка осей в примитивах.
+        Поворот кадра при каждом обновлении не нужен. Буфер очищается"""
+        degrees %= 360
+        swap = degrees in (90, 270)
+        self.orientation = degrees
+        self._swap_xy = swap
+        if swap:
+            self.width, self.height = self._ph, self._pw
+            self.fb = _TransposedFB(self._pfb)
+        else:
+            self.width, self.height = self._pw, self._ph
+            self.fb = self._pfb
+        
+        # Транспонирование - это отражение, второе отражение делает контроллер
+        seg, com = {0: (0xA1, 0xC8), 90: (0xA0, 0xC8),
+                    180: (0xA0, 0xC0), 270: (0xA1, 0xC0)}[degrees]
+        if hasattr(self, '_write_cmds'):
+            self._write_cmds(bytes((seg, com)))
+        
+        self._pfb.fill(0)
+        self._synced = False
+        self.mark_dirty()
 
     # --- ГРАФИКА ---
-    def draw_bitmap(self, bitmap, x, y, w, h, color=1):
-        """Отрисовка монохромного bitmap (1 бит на пиксель)"""
-        for dy in range(h):
-            for dx in range(w):
-                byte = bitmap[dy * ((w + 7) // 8) + (dx // 8)]
-                if byte & (1 << (dx % 8)):
-                    self.pixel(x + dx, y + dy, color)
-        self.update(1)  # Или прямой вызов self.oled.show()
+    def _compiled(self, data, w, h):
+        """[FrameBuffer для blit, MONO_VLSB в физических осях для XOR или None].
+        Неизменяемые bytes компилируются один раз и живут в кэше"""
+        key = (id(data), w, h, self._swap_xy)
+        entry = self._bitmaps.get(key)
+        if entry is not None and entry[0] is data:
+            return entry[1]
+        if self._swap_xy:
+            # Портрет: транспонированный источник, он же годится для XOR
+            vbuf = _lsb_rows_to_vlsb_t(data, w, h)
+            compiled = [framebuf.FrameBuffer(vbuf, h, w, framebuf.MONO_VLSB), vbuf]
+        else:
+            # XBM хранит левый пиксель в младшем бите, MONO_HLSB - в старшем
+            stride = (w + 7) >> 3
+            hbuf = bytearray(stride * h)
+            for i in range(stride * h):
+                hbuf[i] = _REV[data[i]]
+            compiled = [framebuf.FrameBuffer(hbuf, w, h, framebuf.MONO_HLSB), None]
+        if isinstance(data, bytes):
+            if len(self._bitmaps) >= 16:
+                self._bitmaps.clear()
+            self._bitmaps[key] = (data, compiled)
+        return compiled
+
+    def _xor_vlsb(self, src, sw, sh, x, y):
+        """XOR bitmap MONO_VLSB sw x sh в буфер кадра с физическими (x, y) и отсечением"""
+        buf = self.buffer
+        pw = self._pw
+        pages = self._ph >> 3
+        c0 = max(0, -x)
+        c1 = min(sw, pw - x)
+        for p in range((sh + 7) >> 3):
+            ty = y + 8 * p
+            page = ty >> 3
+            s = ty & 7
+            if page >= pages or page < -1:
+                continue
+            base = p * sw
+            for c in range(c0, c1):
+                v = src[base + c] << s
+                if not v:
+                    continue
+                if page >= 0:
+                    buf[page * pw + x + c] ^= v & 0xFF
+                if s and page + 1 < pages:
+                    buf[(page + 1) * pw + x + c] ^= v >> 8
+
+    def draw_bitmap(self, bitmap, x, y, w, h, color=1, op=OR, key=-1):
+        """Отрисовка монохромного bitmap (1 бит на пиксель, строки, младший бит слева).
+        op: OR - единицы рисуются цветом color (по умолчанию), COPY - весь прямоугольник
+        (key - прозрачный цвет источника), AND - нули гасят пиксели, XOR - инверсия.
+        Экран не обновляется: вызовите update()"""
+        fb, vbuf = self._compiled(bitmap, w, h)
+        self._mark(x, y, x + w - 1, y + h - 1)
+        if op == XOR:
+            if vbuf is None:
+                vbuf = _lsb_rows_to_vlsb(bitmap, w, h)
+                if isinstance(bitmap, bytes):
+                    self._compiled(bitmap, w, h)[1] = vbuf
+            if self._swap_xy:
+                self._xor_vlsb(vbuf, h, w, y, x)
+            else:
+                self._xor_vlsb(vbuf, w, h, x, y)
+        elif op == AND:
+            self.fb.blit(fb, x, y, 1)
+        else:
+            if op != COPY:
+                key = 0  # OR: прозрачны нули источника
+            if color:
+                self.fb.blit(fb, x, y, key)
+            else:
+                # Ключ сравнивается уже с цветом после палитры
+                self.fb.blit(fb, x, y, 1 - key if key >= 0 else -1, self._inv_palette())
+
+    def draw_sprites(self, sprites, erase=False):
+        """Вывод пачки спрайтов (sillyGFX.sprite) с отсечением невидимых.
+        erase=True сначала стирает спрайты там, где они были нарисованы прошлым вызовом
+        (для статичного чёрного фона без fill_screen). Возвращает число нарисованных"""
+        width = self.width
+        height = self.height
+        swap = self._swap_xy
+        blit = self.fb.blit
+        mark = self._mark
+        if erase:
+            for s in sprites:
+                if s._ox is not None:
+                    self.fill_rect(s._ox, s._oy, s.sheet.frame_w, s.sheet.frame_h, 0)
+                    s._ox = None
+        drawn = 0
+        for s in sprites:
+            if not s.visible:
+                continue
+            sheet = s.sheet
+            x = s.x
+            y = s.y
+            fw = sheet.frame_w
+            fh = sheet.frame_h
+            if x >= width or y >= height or x + fw <= 0 or y + fh <= 0:
+                continue  # Целиком за экраном
+            blit(sheet.frame(s.frame, s.flip_x, s.flip_y, swap), x, y, sheet.key)
+            mark(x, y, x + fw - 1, y + fh - 1)
+            s._ox = x
+            s._oy = y
+            drawn += 1
+        return drawn
+
+    def draw_particles(self, particles, color=1):
+        """Вывод системы частиц (sillyGFX.particles) прямо в байты буфера.
+        Сначала стираются пиксели прошлого вывода, затем ставятся текущие -
+        остальное изображение не трогается. Возвращает число нарисованных"""
+        buf = self.buffer
+        old = particles._old
+        masks = particles._old_mask
+        box = particles._box
+        if color:
+            for i in range(particles._old_count):
+                buf[old[i]] &= ~masks[i]
+        else:
+            for i in range(particles._old_count):
+                buf[old[i]] |= masks[i]
+        if box[2] >= 0:
+            self._mark(box[0], box[1], box[2], box[3])
+        width = self.width
+        height = self.height
+        pw = self._pw
+        swap = self._swap_xy
+        px = particles.x
+        py = particles.y
+        fp = particles.FP
+        x0 = width
+        y0 = height
+        x1 = y1 = -1
+        drawn = 0
+        for i in range(particles.count):
+            x = px[i] >> fp
+            y = py[i] >> fp
+            if x < 0 or y < 0 or x >= width or y >= height:
+                continue
+            if x < x0: x0 = x
+            if x > x1: x1 = x
+            if y < y0: y0 = y
+            if y > y1: y1 = y
+            if swap:
+                x, y = y, x  # Портрет: в физических осях
+            idx = (y >> 3) * pw + x
+            m = 1 << (y & 7)
+            if color:
+                buf[idx] |= m
+            else:
+                buf[idx] &= ~m
+            old[drawn] = idx
+            masks[drawn] = m
+            drawn += 1
+        particles._old_count = drawn
+        box[0] = x0
+        box[1] = y0
+        box[2] = x1
+        box[3] = y1
+        if drawn:
+            self._mark(x0, y0, x1, y1)
+        return drawn
+
+    def draw_layer(self, layer):
+        """Вывод слоя тайловой карты (sillyGFX.tilemap) с его прокруткой.
+        Рисуются только видимые плитки; при плитках 8x8 и вертикальном смещении,
+        кратном 8, байты плиток копируются прямо в страницы буфера"""
+        width = self.width
+        y0 = layer.y
+        h = min(layer.height or self.height - y0, self.height - y0)
+        vy0 = max(0, y0)  # Видимая часть полосы (слой может уходить за верх экрана)
+        vy1 = y0 + h
+        if vy1 <= vy0:
+            return
+        tiles = layer.tiles
+        t = tiles.tile
+        tmap = layer.map
+        map_w = layer.map_w
+        map_h = layer.map_h
+        empty = layer.empty
+        transparent = layer.transparent
+        ox = layer.scroll_x % layer.width_px
+        oy = layer.scroll_y % layer.height_px
+        self._mark(0, y0, width - 1, y0 + h - 1)
+        
+        if t == 8 and not self._swap_xy and not (oy | y0 | h) & 7:
+            # Быстрый путь: плитка - ровно 8 байт страницы
+            buf = self.buffer
+            zeros = self._zeros
+            for p in range(h >> 3):
+                page = (y0 >> 3) + p
+                if page < 0:
+                    continue  # Страница над экраном
+                mrow = ((oy >> 3) + p) % map_h * map_w
+                base = page * width
+                x = 0
+                tx = ox >> 3
+                s = ox & 7
+                while x < width:
+                    n = min(8 - s, width - x)
+                    idx = tmap[mrow + tx % map_w]
+                    i = base + x
+                    if idx != empty:
+                        tb = tiles.tile_bytes(idx)
+                        if transparent:
+                            for k in range(n):
+                                buf[i + k] |= tb[s + k]
+                        else:
+                            buf[i:i + n] = tb[s:s + n]
+                    elif not transparent:
+                        buf[i:i + n] = zeros[:n]
+                    x += n
+                    tx += 1
+                    s = 0
+            return
+        
+        # Общий путь: blit плиток в FrameBuffer полосы (он же отсекает края).
+        # Полоса начинается с первой видимой строки (в ландшафте - с её страницы)
+        swap = self._swap_xy
+        by = vy0 if swap else vy0 & ~7
+        key = (id(self.buffer), swap, y0, h)
+        if layer._band is None or layer._band[0] != key:
+            mv = memoryview(self.buffer)
+            if swap:
+                # Полоса логических строк - это физические столбцы
+                band = _TransposedFB(framebuf.FrameBuffer(mv[by:], vy1 - by, self._ph,
+                                                          framebuf.MONO_VLSB, self._pw))
+            else:
+                band = framebuf.FrameBuffer(mv[(by >> 3) * width:], width, vy1 - by,
+                                            framebuf.MONO_VLSB, width)
+            layer._band = (key, band)
+        band = layer._band[1]
+        keep = 0
+        if vy0 > by:
+            # Строки страницы над полосой сохраняются и возвращаются после вывода
+            keep = (1 << (vy0 - by)) - 1
+            row = self._row
+            base = (by >> 3) * width
+            row[:width] = memoryview(self.buffer)[base:base + width]
+        off = y0 - by  # Смещение плиток внутри полосы
+        tkey = 0 if transparent else -1
+        sy = oy % t
+        sx = ox % t
+        ty = oy // t
+        tx = ox // t
+        for r in range((h + sy + t - 1) // t):
+            mrow = (ty + r) % map_h * map_w
+            py = r * t - sy + off
+            for c in range((width + sx + t - 1) // t):
+                idx = tmap[mrow + (tx + c) % map_w]
+                if idx == empty:
+                    if not transparent:
+                        band.fill_rect(c * t - sx, py, t, t, 0)
+                    continue
+                band.blit(tiles.frame(idx, False, False, swap), c * t - sx, py, tkey)
+        if keep:
+            buf = self.buffer
+            for i in range(width):
+                buf[base + i] = (buf[base + i] & ~keep) | (row[i] & keep)
+
+    def _inv_palette(self):
+        """Палитра для blit: 0 -> 1, 1 -> 0"""
+        if self._inv is None:
+            self._inv = framebuf.FrameBuffer(bytearray(b'\x01\x00'), 2, 1, framebuf.MONO_VLSB)
+        return self._inv
     
-    def draw_bmp(self, filename, x, y, threshold=128, dither=False):
-        """Поддержка 1-bit, 8-bit и 24-bit BMP"""
+    def draw_bmp(self, filename, x, y, threshold=128, dither=False, crop=None):
+        """Потоковый вывод 1/4/8/24/32-bit BMP (снизу вверх и сверху вниз).
+        Строки читаются readinto в один буфер и пакуются сразу в байты MONO_VLSB.
+        dither - FLOYD_STEINBERG (или True), ATKINSON, BAYER4, BAYER8.
+        crop=(sx, sy, w, h) - вырезать часть картинки (координаты сверху вниз)"""
         try:
             with open(filename, 'rb') as f:
-                # Чтение заголовка
-                header = f.read(54)
-                if len(header) < 54 or header[0] != 0x42 or header[1] != 0x4D:
+                width, height, bpp, data_offset, top_down, palette = _bmp_info(f)
+                
+                sx, sy, cw, ch = crop or (0, 0, width, height)
+                sx = max(0, sx)
+                sy = max(0, sy)
+                cw = min(cw, width - sx)
+                ch = min(ch, height - sy)
+                # Отсечение по экрану
+                if x < 0:
+                    sx -= x
+                    cw += x
+                    x = 0
+                if y < 0:
+                    sy -= y
+                    ch += y
+                    y = 0
+                cw = min(cw, self.width - x)
+                ch = min(ch, self.height - y)
+                if cw <= 0 or ch <= 0:
                     return
-                    
-                # Параметры изображения
-                width = int.from_bytes(header[18:22], 'little')
-                height = int.from_bytes(header[22:26], 'little')
-                bpp = int.from_bytes(header[28:30], 'little')
-                data_offset = int.from_bytes(header[10:14], 'little')
                 
-                # Чтение палитры для 8-bit
-                palette = []
-                if bpp == 8:
-                    f.seek(54)  # Читаем палитру после заголовка
-                    palette_data = f.read(1024)  # 256 цветов по 4 байта
-                    for i in range(256):
-                        blue = palette_data[i*4]
-                        green = palette_data[i*4+1]
-                        red = palette_data[i*4+2]
-                        palette.append((red, green, blue))
+                # Порог заранее: индекс палитры (или яркость) -> 0/1
+                if dither:
+                    lut = palette or bytes(range(256))  # Дизеру нужны яркости
+                    dither = Dither(cw, FLOYD_STEINBERG if dither is True else dither, threshold)
+                else:
+                    src = palette or range(256)
+                    lut = bytes(1 if src[i] > threshold else 0 for i in range(256))
                 
-                # Переход к данным пикселей
-                f.seek(data_offset)
                 row_size = ((width * bpp + 31) // 32) * 4
-                
-                for row in range(height):
-                    row_data = f.read(row_size)
-                    if not row_data:
+                row = bytearray(row_size)
+                out = bytearray(cw)
+                # Нужные строки файла идут подряд: одна перемотка и чтение по порядку
+                first = sy if top_down else height - sy - ch
+                f.seek(data_offset + first * row_size)
+                self._mark(x, y, x + cw - 1, y + ch - 1)
+                for i in range(ch):
+                    if f.readinto(row) < row_size:
                         break
-                        
-                    for col in range(width):
-                        if bpp == 1:
-                            # 1-bit
-                            byte = row_data[col//8]
-                            pixel = (byte >> (7 - (col%8))) & 1
-                        elif bpp == 8:
-                            # 8-bit
-                            index = row_data[col]
-                            red, green, blue = palette[index]
-                            brightness = 0.299*red + 0.587*green + 0.114*blue
-                            pixel = 1 if brightness > threshold else 0
-                        else:
-                            # 24-bit
-                            offset = col*3
-                            if offset+2 >= len(row_data):
-                                continue
-                            blue, green, red = row_data[offset], row_data[offset+1], row_data[offset+2]
-                            brightness = 0.299*red + 0.587*green + 0.114*blue
-                            pixel = 1 if brightness > threshold else 0
-                        
-                        # Дизеринг
-                        if dither and pixel == 0 and random()*255 < brightness%256:
-                            pixel = 1
-                        
-                        # Отрисовка
-                        self.pixel(x + col, y + (height - 1 - row), pixel)
+                    _bmp_row(row, bpp, lut, sx, cw, out)
+                    iy = i if top_down else ch - 1 - i
+                    if dither:
+                        dither.row(out, sy + iy)
+                    self._pack_row(out, cw, x, y + iy)
                         
         except Exception as e:
             print("BMP Error:", e)
+
+    def load_image(self, filename):
+        """Картинка .sgi -> (FrameBuffer, ширина, высота) одним чтением, с кэшем.
+        В портрете буфер сразу транспонирован для blit()"""
+        key = (filename, self._swap_xy)
+        image = self._images.get(key)
+        if image is None:
+            with open(filename, 'rb') as f:
+                w, h = _sgi_header(f)
+                buf = bytearray(w * ((h + 7) >> 3))
+                f.readinto(buf)
+            if self._swap_xy:
+                buf = _transpose(buf, w, h)
+                image = (framebuf.FrameBuffer(buf, h, w, framebuf.MONO_VLSB), w, h)
+            else:
+                image = (framebuf.FrameBuffer(buf, w, h, framebuf.MONO_VLSB), w, h)
+            if len(self._images) >= 8:
+                self._images.clear()
+            self._images[key] = image
+        return image
+
+    def draw_image(self, filename, x=0, y=0, key=-1):
+        """Вывод картинки .sgi (см. sillyGFX.image). Если картинка целиком на экране
+        и выровнена по страницам, байты читаются readinto прямо в буфер кадра.
+        key - прозрачный цвет (0/1) при выводе через кэшированный FrameBuffer"""
+        if key == -1 and not self._swap_xy and not y & 7 and x >= 0 and y >= 0 \
+                and (filename, False) not in self._images:
+            with open(filename, 'rb') as f:
+                w, h = _sgi_header(f)
+                if not h & 7 and x + w <= self.width and y + h <= self.height:
+                    self._mark(x, y, x + w - 1, y + h - 1)
+                    mv = memoryview(self.buffer)
+                    base = (y >> 3) * self.width + x
+                    if x == 0 and w == self.width:
+                        f.readinto(mv[base:base + w * (h >> 3)])  # Весь блок страниц разом
+                    else:
+                        for page in range(h >> 3):
+                            f.readinto(mv[base:base + w])
+                            base += self.width
+                    return
+        fb, w, h = self.load_image(filename)
+        self._mark(x, y, x + w - 1, y + h - 1)
+        self.fb.blit(fb, x, y, key)
+
+    def draw_grey(self, data, x, y, w, h, dither=FLOYD_STEINBERG, threshold=128):
+        """Картинка из яркостей 0..255 в памяти (w*h байт построчно, например с камеры)
+        с дизерингом FLOYD_STEINBERG, ATKINSON, BAYER4, BAYER8 или порогом (dither=False)"""
+        x0 = max(0, -x)
+        cw = min(w, self.width - x) - x0
+        ch = min(h, self.height - y)
+        if cw <= 0 or ch <= max(0, -y):
+            return
+        self._mark(x + x0, max(y, 0), x + x0 + cw - 1, y + ch - 1)
+        out = bytearray(cw)
+        if dither:
+            dither = Dither(cw, FLOYD_STEINBERG if dither is True else dither, threshold)
+        for row in range(ch):
+            o = row * w + x0
+            for i in range(cw):
+                out[i] = data[o + i]
+            if dither:
+                dither.row(out, row)
+            else:
+                for i in range(cw):
+                    out[i] = 1 if out[i] > threshold else 0
+            if y + row >= 0:
+                self._pack_row(out, cw, x + x0, y + row)
+
+    def _pack_row(self, bits, n, x, y):
+        """Строка из n пикселей 0/1 (логическая, с x, y) прямо в буфер MONO_VLSB"""
+        buf = self.buffer
+        pw = self._pw
+        if self._swap_xy:
+            # Портрет: логическая строка - физический столбец
+            base = y
+            for i in range(n):
+                px = x + i
+                idx = (px >> 3) * pw + base
+                if bits[i]:
+                    buf[idx] |= 1 << (px & 7)
+                else:
+                    buf[idx] &= ~(1 << (px & 7)) & 0xFF
+            return
+        m = 1 << (y & 7)
+        nm = ~m & 0xFF
+        idx = (y >> 3) * pw + x
+        for i in range(n):
+            if bits[i]:
+                buf[idx + i] |= m
+            else:
+                buf[idx + i] &= nm
             
-    def draw_xbm(self, xbm_data, x, y, w, h, color=1, is_file=False):
+    def draw_xbm(self, xbm_data, x, y, w, h, color=1, is_file=False, op=OR, key=-1):
         """
         Рисует XBM изображение. Поддерживает:
-        - Готовые bytearray (is_file=False)
-        - Непосредственно .xbm файлы (is_file=True)
+        - Готовые bytes/bytearray (is_file=False)
+        - Непосредственно .xbm файлы (is_file=True), разбираются один раз
+        op и key - как в draw_bitmap()
         """
         if is_file:
-            try:
-                # Чтение и парсинг файла
-                with open(xbm_data, 'r') as f:
-                    content = f.read()
-                
-                # Автоматическое извлечение данных
-                start = content.find('{') + 1
-                end = content.find('}')
-                data_str = content[start:end].replace('0x', '').replace(',', ' ').split()
-                
-                # Конвертация в bytearray
-                xbm_data = bytearray([int(b, 16) for b in data_str if b])
-            except Exception as e:
-                print(f"XBM Error: {e}")
+            data = self._xbm_files.get(xbm_data)
+            if data is None:
+                try:
+                    # Чтение и парсинг файла
+                    with open(xbm_data, 'r') as f:
+                        content = f.read()
+                    
+                    # Автоматическое извлечение данных
+                    start = content.find('{') + 1
+                    end = content.find('}')
+                    data = bytes(int(b, 16) for b in content[start:end].replace('0x', '').replace(',', ' ').split())
+                except Exception as e:
+                    print(f"XBM Error: {e}")
+                    return
+                if len(self._xbm_files) >= 8:
+                    self._xbm_files.clear()
+                self._xbm_files[xbm_data] = data
+            xbm_data = data
+        
+        self.draw_bitmap(xbm_data, x, y, w, h, color, op, key)
+
+    def line(self, x0, y0, x1, y1, color=1, style=SOLID, phase=0):
+        """Линия Брезенхэма с отсечением по экрану до растеризации.
+        style - SOLID/DOTTED/DASHED или dash_pattern(), шаблон отсчитывается от (x0, y0)"""
+        # Осевые линии - в быстрые ядра (шаблон совпадает при обходе по возрастанию)
+        if y0 == y1:
+            if x0 > x1 and style == SOLID:
+                x0, x1 = x1, x0
+            if x0 <= x1:
+                self.hline(x0, y0, x1 - x0 + 1, color, style, phase - x0)
+                return
+        elif x0 == x1:
+            if y0 > y1 and style == SOLID:
+                y0, y1 = y1, y0
+            if y0 <= y1:
+                self.vline(x0, y0, y1 - y0 + 1, color, style, phase - y0)
                 return
+        
+        if self._swap_xy:
+            x0, y0 = y0, x0
+            x1, y1 = y1, x1
+        self._line_p(x0, y0, x1, y1, color, style, phase)
 
-        # Отрисовка (старый код)
-        for dy in range(h):
-            for dx in range(w):
-                byte = xbm_data[dy * ((w + 7) // 8) + (dx // 8)]
-                if byte & (1 << (dx % 8)):
-                    self.pixel(x + dx, y + dy, color)
-        self.update(1)  # Или прямой вызов self.oled.show()
-
-    def line(self, x0, y0, x1, y1, color=1, style=SOLID):
-        """Расширенная линия с поддержкой DASHED"""
-        dx = abs(x1 - x0)
-        dy = -abs(y1 - y0)
-        sx = 1 if x0 < x1 else -1
-        sy = 1 if y0 < y1 else -1
-        err = dx + dy
-        dot_counter = 0
-        
-        dash_length = 3 if style == DASHED else 1
-        
-        while True:
-            if (style == SOLID or 
-                (style == DOTTED and dot_counter % 2 == 0) or
-                (style == DASHED and dot_counter % (dash_length * 2) < dash_length)):
-                self.pixel(x0, y0, color)
-            dot_counter += 1
-            
-            if x0 == x1 and y0 == y1:
-                break
-            e2 = 2 * err
-            if e2 >= dy:
-                err += dy
-                x0 += sx
-            if e2 <= dx:
-                err += dx
-                y0 += sy
-        
-    def hline(self, x, y, w, color=1, style=SOLID):
-        """Оптимизированная горизонтальная линия со стилями"""
-        if y < 0 or y >= self.height:
+    def _line_p(self, x0, y0, x1, y1, color, style, phase):
+        """Растеризация в координатах матрицы. Ведущая ось u, ведомая v:
+        v(k) = v0 + sv * (2*k*amin + amaj) // (2*amaj), поэтому диапазон шагов k
+        внутри экрана считается заранее, а ошибка на входе восстанавливается точно"""
+        W = self._pw
+        H = self._ph
+        if ((x0 < 0 and x1 < 0) or (x0 >= W and x1 >= W) or
+                (y0 < 0 and y1 < 0) or (y0 >= H and y1 >= H)):
+            return  # Целиком по одну сторону от экрана
+        
+        adx = abs(x1 - x0)
+        ady = abs(y1 - y0)
+        sx = 1 if x1 >= x0 else -1
+        sy = 1 if y1 >= y0 else -1
+        x_major = adx >= ady
+        if x_major:
+            u0, v0, su, sv, amaj, amin, U, V = x0, y0, sx, sy, adx, ady, W, H
+        else:
+            u0, v0, su, sv, amaj, amin, U, V = y0, x0, sy, sx, ady, adx, H, W
+        
+        # Отсечение по ведущей оси
+        if su > 0:
+            ks = max(0, -u0)
+            ke = min(amaj, U - 1 - u0)
+        else:
+            ks = max(0, u0 - (U - 1))
+            ke = min(amaj, u0)
+        
+        # Отсечение по ведомой оси: допустимое смещение j = jlo..jhi
+        if sv > 0:
+            jlo = -v0
+            jhi = V - 1 - v0
+        else:
+            jlo = v0 - (V - 1)
+            jhi = v0
+        two_maj = 2 * amaj
+        two_min = 2 * amin
+        if amin:
+            ks = max(ks, -((amaj - two_maj * jlo) // two_min))       # ceil
+            ke = min(ke, -((-amaj * (2 * jhi + 1)) // two_min) - 1)  # ceil - 1
+        elif jlo > 0 or jhi < 0:
             return
-            
-        x_start = max(x, 0)
-        x_end = min(x + w, self.width)
-        dot_counter = x_start if style != SOLID else 0
+        if ks > ke:
+            return
+        
+        # Состояние Брезенхэма в первой видимой точке
+        num = 2 * ks * amin + amaj
+        j = num // two_maj
+        rem = num - j * two_maj
+        u = u0 + su * ks
+        v = v0 + sv * j
+        
+        u_end = u0 + su * ke
+        v_end = v0 + sv * ((2 * ke * amin + amaj) // two_maj)
+        if x_major:
+            bx0, by0, bx1, by1 = min(u, u_end), min(v, v_end), max(u, u_end), max(v, v_end)
+        else:
+            bx0, by0, bx1, by1 = min(v, v_end), min(u, u_end), max(v, v_end), max(u, u_end)
+        if self._swap_xy:
+            self._mark(by0, bx0, by1, bx1)
+        else:
+            self._mark(bx0, by0, bx1, by1)
+        
+        # Бегущий бит по шаблону: на шаге только проверка бита
+        bits, length = (0b1, 1) if style == SOLID else _PATTERNS.get(style, style)
+        bit = 1 << ((phase + ks) % length)
+        top = 1 << length
+        px = self._pfb.pixel
         
-        for x_pos in range(x_start, x_end):
-            if style == SOLID or (style == DOTTED and dot_counter % 2 == 0):
-                self.pixel(x_pos, y, color)
-            dot_counter += 1
+        for _ in range(ke - ks + 1):
+            if bits & bit:
+                if x_major:
+                    px(u, v, color)
+                else:
+                    px(v, u, color)
+            bit <<= 1
+            if bit == top:
+                bit = 1
+            u += su
+            rem += two_min
+            if rem >= two_maj:
+                rem -= two_maj
+                v += sv
+
+    def polyline(self, points, color=1, style=SOLID, phase=0, closed=False):
+        """Ломаная из плоского буфера координат: array('h', [x0, y0, x1, y1, ...]).
+        Шаблон стиля продолжается через вершины"""
+        n = len(points) & ~1
+        if n < 4:
+            return
+        line = self.line
+        x0 = points[0]
+        y0 = points[1]
+        for i in range(2, n, 2):
+            x1 = points[i]
+            y1 = points[i + 1]
+            line(x0, y0, x1, y1, color, style, phase)
+            phase += max(abs(x1 - x0), abs(y1 - y0))
+            x0 = x1
+            y0 = y1
+        if closed:
+            line(x0, y0, points[0], points[1], color, style, phase)
 
-    def vline(self, x, y, h, color=1, style=SOLID):
-        """Оптимизированная вертикальная линия со стилями"""
+    def lines(self, segments, color=1, style=SOLID):
+        """Пачка отрезков из плоского буфера: array('h', [x0, y0, x1, y1, ...])"""
+        line = self.line
+        for i in range(0, len(segments) - 3, 4):
+            line(segments[i], segments[i + 1], segments[i + 2], segments[i + 3],
+                 color, style)
+
+    def hline(self, x, y, w, color=1, style=SOLID, phase=0):
+        """Горизонтальная линия; style - SOLID/DOTTED/DASHED или dash_pattern().
+        Шаблон привязан к абсолютной координате X (+ phase), сетки совпадают"""
+        if style == SOLID:
+            self.fill_rect(x, y, w, 1, color)
+            return
+        if y < 0 or y >= self.height:
+            return
+        a = max(x, 0)
+        b = min(x + w, self.width)
+        if a >= b:
+            return
+        self._mark(a, y, b - 1, y)
+        pattern = _PATTERNS.get(style, style)
+        if self._swap_xy:
+            self._pattern_v(y, a, b - a, color, pattern, phase)
+        else:
+            self._pattern_h(a, y, b - a, color, pattern, phase)
+
+    def vline(self, x, y, h, color=1, style=SOLID, phase=0):
+        """Вертикальная линия; style - SOLID/DOTTED/DASHED или dash_pattern()"""
+        if style == SOLID:
+            self.fill_rect(x, y, 1, h, color)
+            return
         if x < 0 or x >= self.width:
             return
-            
-        y_start = max(y, 0)
-        y_end = min(y + h, self.height)
-        dot_counter = y_start if style != SOLID else 0
-        
-        for y_pos in range(y_start, y_end):
-            if style == SOLID or (style == DOTTED and dot_counter % 2 == 0):
-                self.pixel(x, y_pos, color)
-            dot_counter += 1
+        a = max(y, 0)
+        b = min(y + h, self.height)
+        if a >= b:
+            return
+        self._mark(x, a, x, b - 1)
+        pattern = _PATTERNS.get(style, style)
+        if self._swap_xy:
+            self._pattern_h(a, x, b - a, color, pattern, phase)
+        else:
+            self._pattern_v(x, a, b - a, color, pattern, phase)
 
-    def rect(self, x, y, w, h, color=1, fill=NO_FILL, style=SOLID):
+    def _pattern_h(self, x, y, w, color, pattern, phase):
+        """Шаблонная линия вдоль строки матрицы: отрезки "вкл." целиком через ядро заливки"""
+        runs = _pattern_info(pattern)[0]
+        length = pattern[1]
+        end = x + w
+        base = x - (x + phase) % length  # Где начинается период, содержащий x
+        while base < end:
+            for start, n in runs:
+                a = base + start
+                b = a + n
+                if a < x: a = x
+                if b > end: b = end
+                if a < b:
+                    self._span_fill(a, y, b - a, 1, color)
+            base += length
+
+    def _pattern_v(self, x, y, h, color, pattern, phase):
+        """Шаблонная линия вдоль столбца матрицы: по одной байтовой маске на страницу"""
+        ext = _pattern_info(pattern)[1]
+        length = pattern[1]
+        buf = self.buffer
+        W = self._pw
+        y1 = y + h - 1
+        p0 = y >> 3
+        p1 = y1 >> 3
+        for page in range(p0, p1 + 1):
+            # 8 бит шаблона начиная с индекса первой строки страницы
+            mask = (ext >> ((page * 8 + phase) % length)) & 0xFF
+            if page == p0: mask &= (0xFF << (y & 7)) & 0xFF
+            if page == p1: mask &= 0xFF >> (7 - (y1 & 7))
+            i = page * W + x
+            if color == INVERT:
+                buf[i] ^= mask
+            elif color:
+                buf[i] |= mask
+            else:
+                buf[i] &= ~mask
+
+    def rect(self, x, y, w, h, color=1, fill=NO_FILL, style=SOLID, phase=0):
         """Оптимизированный прямоугольник с заливкой и стилями"""
         if fill:
-            for dy in range(h):
-                self.hline(x, y+dy, w, color)
+            self.fill_rect(x, y, w, h, color)
         else:
             # Оптимизированные границы
-            self.hline(x, y, w, color, style)  # Верх
-            self.hline(x, y + h - 1, w, color, style)  # Низ
-            self.vline(x, y, h, color, style)  # Лево
-            self.vline(x + w - 1, y, h, color, style)  # Право
+            self.hline(x, y, w, color, style, phase)  # Верх
+            self.hline(x, y + h - 1, w, color, style, phase)  # Низ
+            self.vline(x, y, h, color, style, phase)  # Лево
+            self.vline(x + w - 1, y, h, color, style, phase)  # Право
     
     def triangle(self, x0, y0, x1, y1, x2, y2, color=1, fill=NO_FILL):
         """Треугольник с заливкой"""
         if fill:
-            # Алгоритм заливки треугольника
-            def draw_flat_bottom_triangle(x1, y1, x2, y2, x3, y3):
-                for y in range(y1, y2 + 1):
-                    x_start = x1 + (x2 - x1) * (y - y1) // (y2 - y1)
-                    x_end = x1 + (x3 - x1) * (y - y1) // (y3 - y1)
-                    self.line(x_start, y, x_end, y, color)
-            
-            # Сортировка вершин по Y
-            if y0 > y1: x0, y0, x1, y1 = x1, y1, x0, y0
-            if y0 > y2: x0, y0, x2, y2 = x2, y2, x0, y0
-            if y1 > y2: x1, y1, x2, y2 = x2, y2, x1, y1
+            tri = self._tri
+            tri[0] = x0; tri[1] = y0
+            tri[2] = x1; tri[3] = y1
+            tri[4] = x2; tri[5] = y2
+            self.fill_polygon(tri, color)
+            if color == INVERT:
+                return  # Контур поверх инверсии стёр бы края
+        self.line(x0, y0, x1, y1, color)
+        self.line(x1, y1, x2, y2, color)
+        self.line(x2, y2, x0, y0, color)
+
+    def polygon(self, points, color=1, fill=NO_FILL, rule=EVEN_ODD):
+        """Многоугольник из плоского буфера array('h', [x0, y0, x1, y1, ...])"""
+        if fill:
+            self.fill_polygon(points, color, rule)
+            if color == INVERT:
+                return
+        self.polyline(points, color, closed=True)
+
+    def fill_polygon(self, points, color=1, rule=EVEN_ODD):
+        """Заливка произвольного (в т.ч. невыпуклого) многоугольника сканирующими строками.
+        Вершины - центры пикселей; пиксель закрашивается, если его центр внутри: левые/верхние края включены,
+        правые/нижние нет - соседние многоугольники не перекрываются и не оставляют щелей.
+        rule: EVEN_ODD или NON_ZERO"""
+        n = len(points) >> 1
+        if n < 3:
+            return
+        
+        # Таблица рёбер: [y_top, y_bottom, x (фикс. точка) на y_top, шаг x на строку, направление]
+        edges = []
+        xa = points[2 * n - 2]
+        ya = points[2 * n - 1]
+        for i in range(n):
+            xb = points[2 * i]
+            yb = points[2 * i + 1]
+            if ya != yb:
+                if ya < yb:
+                    edges.append([ya, yb, xa << _FP, ((xb - xa) << _FP) // (yb - ya), 1])
+                else:
+                    edges.append([yb, ya, xb << _FP, ((xa - xb) << _FP) // (ya - yb), -1])
+            xa = xb
+            ya = yb
+        if not edges:
+            return
+        edges.sort(key=_edge_top)
+        
+        y_start = max(0, edges[0][0])
+        y_end = min(self.height, max(e[1] for e in edges))
+        ceil = (1 << _FP) - 1  # Вершины - центры пикселей: первый x >= xf
+        fill_rect = self.fill_rect
+        
+        active = self._active
+        k = 0
+        for y in range(y_start, y_end):
+            # Новые рёбра (начавшиеся выше экрана сразу продвигаем до y)
+            while k < len(edges) and edges[k][0] <= y:
+                e = edges[k]
+                if e[0] < y:
+                    e[2] += e[3] * (y - e[0])
+                active.append(e)
+                k += 1
+            # Закончившиеся рёбра убираются на месте
+            j = 0
+            for e in active:
+                if e[1] > y:
+                    active[j] = e
+                    j += 1
+            del active[j:]
             
-            if y1 == y2:
-                draw_flat_bottom_triangle(x0, y0, x1, y1, x2, y2)
-            elif y0 == y1:
-                draw_flat_top_triangle(x0, y0, x1, y1, x2, y2)
-            else:
-                # Разделение на два треугольника
-                x_mid = x0 + (x2 - x0) * (y1 - y0) // (y2 - y0)
-                draw_flat_bottom_triangle(x0, y0, x1, y1, x_mid, y1)
-                draw_flat_top_triangle(x1, y1, x_mid, y1, x2, y2)
+            # Пересечения строки по x: порядок почти не меняется от строки
+            # к строке, поэтому сортировка вставками почти ничего не делает
+            for i in range(1, j):
+                e = active[i]
+                x = e[2]
+                m = i - 1
+                while m >= 0 and active[m][2] > x:
+                    active[m + 1] = active[m]
+                    m -= 1
+                active[m + 1] = e
+            winding = 0
+            for e in active:
+                before = winding
+                if rule == EVEN_ODD:
+                    winding ^= 1
+                else:
+                    winding += e[4]
+                if not before and winding:
+                    left = (e[2] + ceil) >> _FP
+                elif before and not winding:
+                    right = (e[2] + ceil) >> _FP
+                    if right > left:
+                        fill_rect(left, y, right - left, 1, color)
+                e[2] += e[3]
+        del active[:]
+
+    def triangles(self, coords, color=1, indices=None):
+        """Пачка залитых треугольников (сетка) одним вызовом.
+        Без indices: coords = [x0, y0, x1, y1, x2, y2, ...] по 6 чисел на треугольник.
+        С indices: coords - вершины [x, y, ...], indices - тройки номеров вершин"""
+        tri = self._tri
+        fill_polygon = self.fill_polygon
+        if indices is None:
+            for i in range(0, len(coords) - 5, 6):
+                for j in range(6):
+                    tri[j] = coords[i + j]
+                fill_polygon(tri, color)
         else:
-            self.line(x0, y0, x1, y1, color)
-            self.line(x1, y1, x2, y2, color)
-            self.line(x2, y2, x0, y0, color)
+            for i in range(0, len(indices) - 2, 3):
+                for j in range(3):
+                    v = indices[i + j] * 2
+                    tri[2 * j] = coords[v]
+                    tri[2 * j + 1] = coords[v + 1]
+                fill_polygon(tri, color)
 
     def rounded_rect(self, x, y, w, h, r, color=1, fill=NO_FILL):
         """Прямоугольник со скругленными углами"""
+        r = max(0, min(r, w // 2, h // 2))
         if fill:
-            # Заливка центра
-            self.rect(x + r, y, w - 2 * r, h, color, FILL)
-            self.rect(x, y + r, w, h - 2 * r, color, FILL)
-            # Заливка углов
-            self.circle(x + r, y + r, r, color, FILL)
-            self.circle(x + w - r - 1, y + r, r, color, FILL)
-            self.circle(x + r, y + h - r - 1, r, color, FILL)
-            self.circle(x + w - r - 1, y + h - r - 1, r, color, FILL)
+            # Каждая строка заливается ровно один раз (важно для INVERT)
+            spans = self._circle_spans(r)
+            for i in range(r):
+                half = spans[r - i]
+                sx = x + r - half
+                sw = w - 2 * r + 2 * half
+                self.fill_rect(sx, y + i, sw, 1, color)           # Верхние углы
+                self.fill_rect(sx, y + h - 1 - i, sw, 1, color)   # Нижние углы
+            self.fill_rect(x, y + r, w, h - 2 * r, color)         # Середина
         else:
             # Рамка
-            self.line(x + r, y, x + w - r - 1, y, color)
-            self.line(x + r, y + h - 1, x + w - r - 1, y + h - 1, color)
-            self.line(x, y + r, x, y + h - r - 1, color)
-            self.line(x + w - 1, y + r, x + w - 1, y + h - r - 1, color)
-            # Углы
-            self.circle(x + r, y + r, r, color, NO_FILL)
-            self.circle(x + w - r - 1, y + r, r, color, NO_FILL)
-            self.circle(x + r, y + h - r - 1, r, color, NO_FILL)
-            self.circle(x + w - r - 1, y + h - r - 1, r, color, NO_FILL)
+            self.hline(x + r, y, w - 2 * r, color)
+            self.hline(x + r, y + h - 1, w - 2 * r, color)
+            self.vline(x, y + r, h - 2 * r, color)
+            self.vline(x + w - 1, y + r, h - 2 * r, color)
+            # Углы - четверти окружности из кэша октанта
+            left = x + r
+            right = x + w - r - 1
+            top = y + r
+            bottom = y + h - r - 1
+            self._mark(x, y, x + w - 1, y + h - 1)
+            px = self.fb.pixel
+            octant = self._circle_table(r)[0]
+            for i in range(0, len(octant), 2):
+                a = octant[i]
+                b = octant[i + 1]
+                px(left - a, top - b, color)
+                px(left - b, top - a, color)
+                px(right + a, top - b, color)
+                px(right + b, top - a, color)
+                px(left - a, bottom + b, color)
+                px(left - b, bottom + a, color)
+                px(right + a, bottom + b, color)
+                px(right + b, bottom + a, color)
 
-    def circle(self, x, y, r, color=1, fill=NO_FILL):
-        """Оптимизированная окружность с заливкой"""
+    def _cache_conic(self, key, table):
+        """Ограниченный кэш таблиц: при переполнении начинаем заново"""
+        if len(self._conics) >= 24:
+            self._conics.clear()
+        self._conics[key] = table
+        return table
+
+    def _circle_table(self, r):
+        """(точки октанта [x0, y0, ...], полуширина для каждой строки 0..r).
+        Средняя точка считается один раз на радиус"""
+        table = self._conics.get(r)
+        if table is not None:
+            return table
+        octant = array('h')
+        spans = array('h', bytes(2 * (r + 1)))
         f = 1 - r
         ddf_x = 1
         ddf_y = -2 * r
         x0 = 0
         y0 = r
-        
         while x0 <= y0:
-            if fill:
-                # Заливка оптимизирована через hline
-                self.hline(x - y0, y + x0, 2 * y0 + 1, color)
-                self.hline(x - y0, y - x0, 2 * y0 + 1, color)
-                self.hline(x - x0, y + y0, 2 * x0 + 1, color)
-                self.hline(x - x0, y - y0, 2 * x0 + 1, color)
-            else:
-                # Только граница
-                self.pixel(x + x0, y + y0, color)
-                self.pixel(x - x0, y + y0, color)
-                self.pixel(x + x0, y - y0, color)
-                self.pixel(x - x0, y - y0, color)
-                self.pixel(x + y0, y + x0, color)
-                self.pixel(x - y0, y + x0, color)
-                self.pixel(x + y0, y - x0, color)
-                self.pixel(x - y0, y - x0, color)
-            
+            octant.append(x0)
+            octant.append(y0)
+            if spans[y0] < x0: spans[y0] = x0
+            if spans[x0] < y0: spans[x0] = y0
             if f >= 0:
                 y0 -= 1
                 ddf_y += 2
@@ -423,43 +1936,453 @@ class SillyGFX:
             x0 += 1
             ddf_x += 2
             f += ddf_x
+        return self._cache_conic(r, (octant, spans))
+
+    def _circle_spans(self, r):
+        """Полуширина окружности радиуса r для каждой строки от центра (0..r)"""
+        return self._circle_table(r)[1]
+
+    def _ellipse_spans(self, rx, ry):
+        """Полуширина эллипса для каждой строки 0..ry (средняя точка, x4 без дробей)"""
+        key = rx | (ry << 12) | (1 << 24)
+        spans = self._conics.get(key)
+        if spans is not None:
+            return spans
+        spans = array('h', bytes(2 * (ry + 1)))
+        rx2 = rx * rx
+        ry2 = ry * ry
+        x = 0
+        y = ry
+        px = 0
+        py = 2 * rx2 * y
+        # Область 1: наклон меньше 1, шагаем по x
+        p = 4 * ry2 - 4 * rx2 * ry + rx2
+        while px < py:
+            if spans[y] < x: spans[y] = x
+            x += 1
+            px += 2 * ry2
+            if p < 0:
+                p += 4 * (ry2 + px)
+            else:
+                y -= 1
+                py -= 2 * rx2
+                p += 4 * (ry2 + px - py)
+        # Область 2: шагаем по y
+        p = ry2 * (2 * x + 1) * (2 * x + 1) + 4 * rx2 * (y - 1) * (y - 1) - 4 * rx2 * ry2
+        while y >= 0:
+            if spans[y] < x: spans[y] = x
+            y -= 1
+            py -= 2 * rx2
+            if p > 0:
+                p += 4 * (rx2 - py)
+            else:
+                x += 1
+                px += 2 * ry2
+                p += 4 * (rx2 - py + px)
+        return self._cache_conic(key, spans)
+
+    def _conic_rows(self, x, y, spans, ry, color):
+        """Заливка по таблице полуширин: каждая строка ровно одной полосой"""
+        fill_rect = self.fill_rect
+        fill_rect(x - spans[0], y, 2 * spans[0] + 1, 1, color)
+        for dy in range(1, ry + 1):
+            half = spans[dy]
+            fill_rect(x - half, y - dy, 2 * half + 1, 1, color)
+            fill_rect(x - half, y + dy, 2 * half + 1, 1, color)
+
+    def circle(self, x, y, r, color=1, fill=NO_FILL):
+        """Оптимизированная окружность с заливкой"""
+        if fill:
+            # Одна полоса на строку через ядро заливки
+            self._conic_rows(x, y, self._circle_spans(r), r, color)
+            return
+        
+        self._mark(x - r, y - r, x + r, y + r)
+        px = self.fb.pixel
+        octant = self._circle_table(r)[0]
+        for i in range(0, len(octant), 2):
+            x0 = octant[i]
+            y0 = octant[i + 1]
+            # Только граница
+            px(x + x0, y + y0, color)
+            px(x - x0, y + y0, color)
+            px(x + x0, y - y0, color)
+            px(x - x0, y - y0, color)
+            px(x + y0, y + x0, color)
+            px(x - y0, y + x0, color)
+            px(x + y0, y - x0, color)
+            px(x - y0, y - x0, color)
+
+    def ellipse(self, x, y, rx, ry, color=1, fill=NO_FILL):
+        """Эллипс с полуосями rx, ry"""
+        if rx <= 0 or ry <= 0:
+            self.fill_rect(x - max(rx, 0), y - max(ry, 0),
+                           2 * max(rx, 0) + 1, 2 * max(ry, 0) + 1, color)
+            return
+        spans = self._ellipse_spans(rx, ry)
+        if fill:
+            self._conic_rows(x, y, spans, ry, color)
+            return
+        
+        # Контур: в каждой строке от полуширины соседней внешней строки до своей
+        fill_rect = self.fill_rect
+        for dy in range(ry, -1, -1):
+            half = spans[dy]
+            start = spans[dy + 1] + 1 if dy < ry else 0
+            if start > half:
+                start = half
+            if start == 0:
+                fill_rect(x - half, y - dy, 2 * half + 1, 1, color)
+                if dy:
+                    fill_rect(x - half, y + dy, 2 * half + 1, 1, color)
+                continue
+            n = half - start + 1
+            fill_rect(x + start, y - dy, n, 1, color)
+            fill_rect(x - half, y - dy, n, 1, color)
+            if dy:
+                fill_rect(x + start, y + dy, n, 1, color)
+                fill_rect(x - half, y + dy, n, 1, color)
+
+    def _sector(self, start_angle, end_angle):
+        """Сектор по часовой стрелке от start до end (0 - вправо, градусы) ->
+        список клиньев не шире 180 как пар целых направляющих векторов"""
+        s = start_angle % 360
+        sweep = (end_angle - start_angle) % 360
+        if sweep == 0:
+            if end_angle == start_angle:
+                return []
+            sweep = 360
+        bounds = (s, s + sweep) if sweep <= 180 else (s, s + 180, s + sweep)
+        vec = [(int(cos(a * pi / 180) * 1024), int(sin(a * pi / 180) * 1024)) for a in bounds]
+        return [vec[i] + vec[i + 1] for i in range(len(vec) - 1)]
+
+    @staticmethod
+    def _wedge(dy, wedge, lo, hi):
+        """Отрезок [lo, hi] строки dy, попадающий в клин (ax, ay, bx, by)"""
+        ax, ay, bx, by = wedge
+        # cross(A, P) >= 0  <=>  ay * px <= ax * dy
+        t = ax * dy
+        if ay > 0:
+            hi = min(hi, t // ay)
+        elif ay < 0:
+            lo = max(lo, -(-t // ay))
+        elif t < 0:
+            return lo, lo - 1
+        # cross(P, B) >= 0  <=>  by * px >= bx * dy
+        t = bx * dy
+        if by > 0:
+            lo = max(lo, -(-t // by))
+        elif by < 0:
+            hi = min(hi, t // by)
+        elif t > 0:
+            return lo, lo - 1
+        return lo, hi
+
+    def arc(self, x, y, r, start_angle, end_angle, color=1):
+        """Дуга окружности от start_angle до end_angle по часовой стрелке (0 - вправо)"""
+        wedges = self._sector(start_angle, end_angle)
+        if not wedges:
+            return
+        self._mark(x - r, y - r, x + r, y + r)
+        px = self.fb.pixel
+        wedge = self._wedge
+        octant = self._circle_table(r)[0]
+        for i in range(0, len(octant), 2):
+            a = octant[i]
+            b = octant[i + 1]
+            for dx, dy in ((a, b), (-a, b), (a, -b), (-a, -b),
+                           (b, a), (-b, a), (b, -a), (-b, -a)):
+                for w in wedges:
+                    lo, hi = wedge(dy, w, dx, dx)
+                    if lo <= hi:
+                        px(x + dx, y + dy, color)
+                        break
+
+    def pie(self, x, y, r, start_angle, end_angle, color=1, fill=FILL):
+        """Сектор круга: каждая строка - одна или две полосы, без перерисовки"""
+        wedges = self._sector(start_angle, end_angle)
+        if not wedges:
+            return
+        if not fill:
+            self.arc(x, y, r, start_angle, end_angle, color)
+            for a in (start_angle, end_angle):
+                self.line(x, y, x + int(r * cos(a * pi / 180) + 0.5),
+                          y + int(r * sin(a * pi / 180) + 0.5), color)
+            return
+        
+        spans = self._circle_spans(r)
+        fill_rect = self.fill_rect
+        wedge = self._wedge
+        for dy in range(-r, r + 1):
+            half = spans[dy if dy >= 0 else -dy]
+            lo, hi = wedge(dy, wedges[0], -half, half)
+            if len(wedges) > 1:
+                lo2, hi2 = wedge(dy, wedges[1], -half, half)
+                if lo > hi:
+                    lo, hi = lo2, hi2
+                elif lo2 <= hi2:
+                    if lo2 > hi + 1 or lo > hi2 + 1:
+                        # Два несмежных отрезка
+                        fill_rect(x + lo2, y + dy, hi2 - lo2 + 1, 1, color)
+                    else:
+                        lo = min(lo, lo2)
+                        hi = max(hi, hi2)
+            if lo <= hi:
+                fill_rect(x + lo, y + dy, hi - lo + 1, 1, color)
+
     # --- ТЕКСТ ---
-    def char(self, char, x, y, color=1):
+    def char(self, char, x, y, color=1, scale=1):
         """Вывод одного символа"""
-        self.text(char, x, y, color)
+        self.text(char, x, y, color, scale)
         
-    def set_font(self, font_data, width=5, height=7):
-        """Безопасная установка шрифта"""
+    def set_font(self, font_data, width=5, height=7, rows=None, proportional=False):
+        """Безопасная установка шрифта.
+        rows - глифы строками (MONO_HLSB, как 8x16), иначе столбцами (MONO_VLSB, как 5x7);
+        по умолчанию берётся из PackedFont или строками для шрифтов выше 8 px.
+        proportional - ширина символа по его чернилам, а не width"""
         self._font = font_data  # Основное хранилище
         self._font_width = width
         self._font_height = height
+        self._font_rows = getattr(font_data, 'rows', height > 8) if rows is None else rows
+        self._font_prop = proportional
         
         # Автоматическая загрузка стандартного шрифта при ошибке
-        if not isinstance(font_data, dict):
+        if not hasattr(font_data, 'get'):  # dict или PackedFont
             from sillyGFX.fonts.font5x7 import DATA as default_font
             self._font = default_font
+            self._font_width, self._font_height, self._font_rows = 5, 7, False
             print("Внимание: передан неверный шрифт, загружен стандартный")
+        self._advances = {}  # Символ -> (первый столбец, ширина)
+        self._measures = {}  # Кэш ширин строк для measure_text()
+        self._layouts = {}   # Кэш разбиения text_box() на строки
+        self._glyphs = {}    # Глифы старого шрифта (id мог достаться новому объекту)
+
+    def _glyph_src(self, char):
+        """Исходный глиф как FrameBuffer в родном формате шрифта"""
+        font = self._font
+        data = font.get(char)
+        if data is None:
+            data = font.get('?', b'')
+        w = self._font_width
+        h = self._font_height
+        if self._font_rows:
+            size = h * ((w + 7) // 8)
+            fmt = framebuf.MONO_HLSB
+        else:
+            size = w * ((h + 7) // 8)
+            fmt = framebuf.MONO_VLSB
+        buf = bytearray(size)
+        n = min(len(data), size)
+        buf[:n] = bytes(data[:n])  # Короткие глифы дополняются нулями
+        return framebuf.FrameBuffer(buf, w, h, fmt)
 
-    def text(self, text, x, y, color=1):
-        """Исправленный вывод текста"""
+    def _advance(self, char):
+        """(первый столбец, ширина) символа: для моноширинного шрифта (0, width),
+        для пропорционального - границы чернил (пустой глиф - половина ширины)"""
+        adv = self._advances.get(char)
+        if adv is not None:
+            return adv
+        if not self._font_prop:
+            adv = (0, self._font_width)
+        else:
+            src = self._glyph_src(char)
+            x0 = self._font_width
+            x1 = -1
+            for x in range(self._font_width):
+                for y in range(self._font_height):
+                    if src.pixel(x, y):
+                        if x < x0: x0 = x
+                        x1 = x
+                        break
+            adv = (x0, x1 - x0 + 1) if x1 >= 0 else (0, max(1, self._font_width // 2))
+        if len(self._advances) >= 256:
+            self._advances.clear()
+        self._advances[char] = adv
+        return adv
+
+    def measure_text(self, text, scale=1):
+        """Размер строки (ширина, высота) в пикселях с учётом текущего шрифта.
+        Ширины строк кэшируются - центрирование каждый кадр не пересчитывает символы"""
         if not hasattr(self, '_font'):
             raise RuntimeError("Шрифт не установлен. Сначала вызовите set_font()")
+        key = (text, scale)
+        w = self._measures.get(key)
+        if w is None:
+            w = 0
+            advance = self._advance
+            for char in text:
+                w += advance(char)[1] + 1  # Символ + 1px пробел
+            w = max(0, w - 1) * scale
+            if len(self._measures) >= 32:
+                self._measures.clear()
+            self._measures[key] = w
+        return w, self._font_height * scale
+
+    def _glyph(self, char, color, scale=1):
+        """Глиф как FrameBuffer из LRU-кэша по (шрифт, символ, цвет, масштаб).
+        Готовый глиф всегда MONO_VLSB и уже транспонирован для портрета"""
+        key = (id(self._font), self._font_prop, char, color, scale, self._swap_xy)
+        self._glyph_tick += 1
+        entry = self._glyphs.get(key)
+        if entry is not None:
+            entry[1] = self._glyph_tick
+            return entry[0]
         
+        src = self._glyph_src(char)
+        x0, w = self._advance(char)
+        h = self._font_height
+        gw = w * scale
+        gh = h * scale
+        if self._swap_xy:
+            gw, gh = gh, gw  # Портрет: источник для blit должен быть уже транспонирован
+        buf = bytearray(gw * ((gh + 7) // 8))
+        glyph = framebuf.FrameBuffer(buf, gw, gh, framebuf.MONO_VLSB)
+        for x in range(w):
+            for y in range(h):
+                if src.pixel(x0 + x, y):
+                    if self._swap_xy:
+                        glyph.fill_rect(y * scale, x * scale, scale, scale, 1)
+                    else:
+                        glyph.fill_rect(x * scale, y * scale, scale, scale, 1)
+        if not color:
+            # Цвет 0: глиф нулями на фоне из единиц, ключ прозрачности - 1
+            for i in range(len(buf)):
+                buf[i] ^= 0xFF
+        
+        if len(self._glyphs) >= 96:
+            # Выбрасываем самый давно использованный глиф
+            old = min(self._glyphs, key=lambda k: self._glyphs[k][1])
+            del self._glyphs[old]
+        self._glyphs[key] = [glyph, self._glyph_tick]
+        return glyph
+
+    def text(self, text, x, y, color=1, scale=1):
+        """Вывод текста готовыми глифами с учётом метрик шрифта и масштаба"""
+        w, h = self.measure_text(text, scale)
+        self._mark(x, y, x + max(w, 1) - 1, y + h - 1)
+        
+        if (not y & 7 and scale == 1 and not self._swap_xy and not self._font_rows
+                and not self._font_prop and self._font_height <= 8 and 0 <= y < self.height):
+            # Быстрый путь: строка совпадает со страницей, столбцы шрифта
+            # OR-ятся (или стираются) прямо в буфере
+            buf = self.buffer
+            font = self._font
+            width = self.width
+            w = self._font_width
+            mask = (1 << self._font_height) - 1
+            base = (y >> 3) * width
+            for char in text:
+                if x >= width:
+                    break
+                cols = font.get(char)
+                if cols is None:
+                    cols = font.get('?', b'')
+                for col in range(min(w, len(cols))):
+                    cx = x + col
+                    if 0 <= cx < width:
+                        if color:
+                            buf[base + cx] |= cols[col] & mask
+                        else:
+                            buf[base + cx] &= ~(cols[col] & mask) & 0xFF
+                x += w + 1
+            return
+        
+        blit = self.fb.blit
+        advance = self._advance
+        key = 0 if color else 1
         for char in text:
-            # Получаем данные символа или заменяем на '?'
-            char_data = self._font.get(char, self._font.get('?', [0]*5))
-            
-            # Отрисовка каждого столбца символа
-            for col in range(min(5, len(char_data))):
-                col_data = char_data[col]
-                for row in range(7):  # Для шрифта 5x7
-                    if col_data & (1 << row):
-                        self.pixel(x + col, y + row, color)
-            x += 6  # 5px символ + 1px пробел
+            blit(self._glyph(char, color, scale), x, y, key)
+            x += (advance(char)[1] + 1) * scale
+
+    def _fit(self, line, w):
+        """Обрезает строку до ширины w с многоточием"""
+        measure = self.measure_text
+        if measure(line)[0] <= w:
+            return line
+        n = len(line)
+        while n and measure(line[:n] + '...')[0] > w:
+            n -= 1
+        return line[:n].rstrip() + '...' if measure('...')[0] <= w else ''
+
+    def _wrap(self, line, w):
+        """Жадный перенос по словам; слово шире w переносится по символам"""
+        measure = self.measure_text
+        out = []
+        cur = ''
+        for word in line.split(' '):
+            ww = measure(word)[0]
+            # Ширина склейки меряется целиком: пробел даёт ещё два межсимвольных зазора
+            if cur and measure(cur + ' ' + word)[0] <= w:
+                cur += ' ' + word
+                continue
+            if cur or out:
+                out.append(cur)
+            while ww > w and len(word) > 1:
+                # Длинное слово режем по символам
+                n = len(word) - 1
+                while n > 1 and measure(word[:n])[0] > w:
+                    n -= 1
+                out.append(word[:n])
+                word = word[n:]
+                ww = measure(word)[0]
+            cur = word
+        out.append(cur)
+        return out
+
+    def _layout(self, text, w, h, align, wrap):
+        """Строки text_box() со смещениями по x: считается один раз на
+        (строку, шрифт, размер, выравнивание), дальше берётся из кэша"""
+        key = (text, id(self._font), self._font_prop, w, h, align, wrap)
+        layout = self._layouts.get(key)
+        if layout is not None:
+            return layout
+        
+        lines = []
+        for line in text.split('\n'):
+            if wrap:
+                lines.extend(self._wrap(line, w))
+            else:
+                lines.append(line)
+        line_h = self._font_height + 1
+        rows = max(0, (h + 1) // line_h)  # Целиком помещающиеся строки
+        if len(lines) > rows:
+            # Не влезло по высоте: последняя видимая строка с многоточием
+            lines = lines[:rows]
+            if rows:
+                lines[-1] = self._fit(lines[-1] + '...', w)
+        layout = []
+        for line in lines:
+            line = self._fit(line, w)
+            dx = 0
+            if align != LEFT:
+                dx = w - self.measure_text(line)[0]
+                if align == CENTER:
+                    dx //= 2
+            layout.append((line, dx))
+        
+        if len(self._layouts) >= 16:
+            self._layouts.clear()
+        self._layouts[key] = layout
+        return layout
+
+    def text_box(self, text, x, y, w, h, align=LEFT, wrap=True, color=1):
+        """Текст в прямоугольнике: перенос по словам ('\\n' - новая строка),
+        выравнивание LEFT/CENTER/RIGHT, обрезка по высоте и ширине с многоточием.
+        Возвращает число выведенных строк"""
+        if not hasattr(self, '_font'):
+            raise RuntimeError("Шрифт не установлен. Сначала вызовите set_font()")
+        layout = self._layout(text, w, h, align, wrap)
+        line_h = self._font_height + 1
+        for line, dx in layout:
+            if line:
+                self.text(line, x + dx, y, color)
+            y += line_h
+        return len(layout)
 
     def pixel(self, x, y, color):
         """Установка пикселя с проверкой границ"""
         if 0 <= x < self.width and 0 <= y < self.height:
-            self.fb.pixel(x, y, color)                          
+            self.fb.pixel(x, y, color)
+            self._mark(x, y, x, y)                          
     
     # --- ДРУГОЕ ---
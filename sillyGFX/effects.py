@@ -1,26 +1,128 @@
-from time import ticks_ms, sleep_ms
-from math import sin, cos
+from time import ticks_ms, ticks_diff, ticks_add, sleep_ms
 from random import random, randint
 from sillyGFX.core import SillyGFX  # Импортируем основной класс
+from sillyGFX.noise import XorShift32, NoisePool, OR
+from sillyGFX.particles import ParticleSystem, Emitter
+
+
+class Animator:
+    """Планировщик кадров: эффекты - генераторы, которые рисуют шаг и отдают
+    задержку до следующего шага в мс (0/None - следующий кадр).
+    Все созревшие эффекты продвигаются за тик, затем один update() на всех"""
+    def __init__(self, gfx, fps=30, budget=None):
+        self.gfx = gfx
+        self.frame_ms = 1000 // fps
+        self.budget = budget or self.frame_ms  # Время на расчёт эффектов за тик, мс
+        self.tasks = []  # [генератор, время следующего шага]
+        self.frames = 0   # Показанные кадры
+        self.skipped = 0  # Шаги, досчитанные без показа (отставание)
+        self._last = ticks_ms()
+
+    def add(self, effect):
+        """Запуск эффекта-генератора параллельно с остальными"""
+        self.tasks.append([effect, ticks_ms()])
+        return effect
+
+    def cancel(self, effect):
+        for task in self.tasks:
+            if task[0] is effect:
+                self.tasks.remove(task)
+                return
+
+    def running(self, effect=None):
+        """Есть ли активные эффекты (или жив ли конкретный)"""
+        if effect is None:
+            return bool(self.tasks)
+        for task in self.tasks:
+            if task[0] is effect:
+                return True
+        return False
+
+    def tick(self):
+        """Один кадр. Отстающий эффект досчитывает пропущенные шаги, пока хватает
+        бюджета, остаток отставания отбрасывается. Возвращает мс до следующего тика"""
+        start = ticks_ms()
+        stepped = False
+        for task in self.tasks[:]:
+            effect = task[0]
+            steps = 0
+            while ticks_diff(start, task[1]) >= 0:
+                try:
+                    delay = next(effect)
+                except StopIteration:
+                    self.tasks.remove(task)
+                    stepped = True
+                    break
+                task[1] = ticks_add(task[1], delay or self.frame_ms)
+                steps += 1
+                stepped = True
+                if ticks_diff(ticks_ms(), start) >= self.budget:
+                    if ticks_diff(start, task[1]) > 0:
+                        task[1] = start  # Не гонимся за отставанием бесконечно
+                    break
+            if steps > 1:
+                self.skipped += steps - 1
+        if stepped:
+            self.gfx.update()
+            self.frames += 1
+            self._last = start
+        
+        # Ближайший шаг, но не чаще целевого FPS
+        if not self.tasks:
+            return self.frame_ms
+        now = ticks_ms()
+        due = min(ticks_diff(task[1], now) for task in self.tasks)
+        return max(0, due, self.frame_ms - ticks_diff(now, self._last))
+
+    def run(self, effect=None):
+        """Блокирующий цикл до окончания эффекта (или всех эффектов)"""
+        while self.running(effect):
+            sleep_ms(self.tick())
+
+    async def run_async(self):
+        """Задача uasyncio: кадры идут, пока остальные задачи обслуживают ввод-вывод"""
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        while True:
+            await asyncio.sleep(self.tick() / 1000)
 
 
 class GFXEffects:
-    def __init__(self, gfx):
+    def __init__(self, gfx, fps=30):
         self.gfx = gfx  # Принимаем любой объект с нужными методами
+        self.animator = Animator(gfx, fps)
+        self.rng = XorShift32(ticks_ms())
+    
+    def _play(self, effect, block):
+        """block=True - дождаться конца (остальные эффекты тоже идут),
+        иначе эффект запускается в планировщике и возвращается как задача"""
+        self.animator.add(effect)
+        if block:
+            self.animator.run(effect)
+        return effect
     
-    def wipe(self, direction=0, speed=5):
+    def wipe(self, direction=0, speed=5, block=True):
         """Универсальная шторка без циклических импортов"""
+        return self._play(self._wipe(direction, speed), block)
+    
+    def _wipe(self, direction, speed):
         step = max(1, speed // 2)
         if direction == 0:  # Horizontal
             for x in range(0, self.gfx.width, step):
                 self.gfx.rect(x, 0, step, self.gfx.height, 1, fill=True)
+                yield 0
         else:  # Vertical
             for y in range(0, self.gfx.height, step):
                 self.gfx.rect(0, y, self.gfx.width, step, 1, fill=True)
-        self.gfx.update()
+                yield 0
         
-    def crt_power_on(self, duration=1000):
+    def crt_power_on(self, duration=1000, block=True):
         """Оптимизированное включение через rect fill"""
+        return self._play(self._crt_power_on(duration), block)
+    
+    def _crt_power_on(self, duration):
         steps = 20
         for i in range(1, steps+1):
             # Плавное заполнение
@@ -35,11 +137,13 @@ class GFXEffects:
                              randint(10,30),
                              randint(2,5),
                              1, fill=True)
-            self.gfx.update()
-            sleep_ms(duration//steps)
+            yield duration//steps
 
-    def crt_power_off(self, duration=800):
+    def crt_power_off(self, duration=800, block=True):
         """Оптимизированное выключение"""
+        return self._play(self._crt_power_off(duration), block)
+    
+    def _crt_power_off(self, duration):
         steps = 20
         for i in range(steps):
             scale = 1 - (i/steps)
@@ -50,147 +154,179 @@ class GFXEffects:
             
             self.gfx.fill_screen(0)
             self.gfx.rect(x, y, w, h, 1, fill=False)
-            self.gfx.update()
-            sleep_ms(duration//steps)
+            yield duration//steps
         
         self.gfx.fill_screen(0)
     
-    def pixel_rain(self, density=1, cycles=200, color=1):
+    def pixel_rain(self, density=1, cycles=200, color=1, block=True):
         """Эффект падающих пикселей с исправленной ошибкой"""
+        return self._play(self._pixel_rain(density, cycles, color), block)
+    
+    def _pixel_rain(self, density, cycles, color):
         width = self.gfx.width
         height = self.gfx.height
         
+        fb = self.gfx.fb
+        bottom = bytearray(width)
         for _ in range(cycles):
-            # Сдвигаем все пиксели вниз
-            for y in range(height-1, 0, -1):
-                for x in range(width):
-                    if self.gfx.fb.pixel(x, y-1):  # Используем напрямую framebuffer
-                        self.gfx.fb.pixel(x, y, color)
-                        self.gfx.fb.pixel(x, y-1, 0)
+            # Нижняя строка копит упавшие капли
+            for x in range(width):
+                bottom[x] = fb.pixel(x, height-1)
+            
+            # Сдвигаем все пиксели вниз побитово, столбцами
+            self.gfx.shift_columns(1)
+            for x in range(width):
+                if bottom[x]:
+                    fb.pixel(x, height-1, color)
             
             # Добавляем новые капли
             if random() < density:
                 x = randint(0, width-1)
-                self.gfx.fb.pixel(x, 0, color)
+                self.gfx.pixel(x, 0, color)
             
-            self.gfx.update()
-            sleep_ms(50)
+            yield 50
             
-    def sparks(self, count=30, duration=2000):
+    def sparks(self, count=30, duration=2000, block=True):
         """Случайные искры на экране"""
+        return self._play(self._sparks(count, duration), block)
+    
+    def _sparks(self, count, duration):
         start = ticks_ms()
+        rng = self.rng
         while ticks_diff(ticks_ms(), start) < duration:
-            self.gfx.pixel(randint(0, self.gfx.width-1), 
-                          randint(0, self.gfx.height-1), 
+            # Один шаг генератора: 12 бит на x, 12 на y, старший байт - пора ли показать кадр
+            r = rng.next()
+            self.gfx.pixel((r & 0xFFF) % self.gfx.width, 
+                          (r >> 12 & 0xFFF) % self.gfx.height, 
                           1)
-            if randint(0, 10) > 7:
-                self.gfx.update()
-                sleep_ms(50)
+            if r >> 24 < 70:  # ~3/11, как randint(0, 10) > 7
+                yield 50
                 
-    def loading_bar(self, duration=3000):
+    def loading_bar(self, duration=3000, block=True):
         """Анимированный прогресс-бар"""
+        return self._play(self._loading_bar(duration), block)
+    
+    def _loading_bar(self, duration):
         for x in range(0, self.gfx.width, 3):
             self.gfx.rect(0, self.gfx.height-5, x, 3, 1, fill=True)
-            self.gfx.update()
-            sleep_ms(duration // (self.gfx.width//3))
+            yield duration // (self.gfx.width//3)
         
-    def tv_scanlines(self, cycles=5, intensity=0.7):
+    def tv_scanlines(self, cycles=5, intensity=0.7, block=True):
         """Эффект горизонтальных полос"""
+        return self._play(self._tv_scanlines(cycles), block)
+    
+    def _tv_scanlines(self, cycles):
         for _ in range(cycles):
             for y in range(0, self.gfx.height, 2):
                 self.gfx.hline(0, y, self.gfx.width, 1)
                 self.gfx.hline(0, y+1, self.gfx.width, 0)
-            self.gfx.update()
-            sleep_ms(100)
+            yield 100
     
-    # Восстанавливаем изображение
+        # Восстанавливаем изображение
         for y in range(0, self.gfx.height, 2):
             self.gfx.hline(0, y, self.gfx.width, 1)
-        self.gfx.update()
     
-    def crt_static(self, duration=1000, speed=3):
-        """Эффект телевизионных помех"""
-        from random import getrandbits
+    def crt_static(self, duration=1000, speed=3, density=0.5, block=True):
+        """Эффект телевизионных помех (density - доля светящихся точек)"""
+        return self._play(self._crt_static(duration, speed, density), block)
+    
+    def _crt_static(self, duration, speed, density):
+        # Страницы шума считаются один раз, кадр - их копии со сдвигом
+        pool = NoisePool(density=density, seed=self.rng.next())
         start = ticks_ms()
         while ticks_diff(ticks_ms(), start) < duration:
-            for i in range(len(self.gfx.buffer)):
-                self.gfx.buffer[i] = getrandbits(8)
-            self.gfx.update(50 // speed)
+            pool.fill(self.gfx.buffer)
+            self.gfx.mark_dirty()
+            yield 50 // speed
         self.gfx.fill_screen(0)
         
-    def typewriter_text(self, text, x, y, color=1, delay=50):
+    def typewriter_text(self, text, x, y, color=1, delay=50, block=True):
         """Эффект печатной машинки с мерцающим курсором"""
-        for i in range(1, len(text)+1):
-            # Очистка области
-            self.gfx.fill_rect(x, y, 
-                             self.gfx._font_width * len(text), 
-                             self.gfx._font_height, 0)
-            
-            # Вывод текста
-            self.gfx.text(text[:i], x, y, color)
+        return self._play(self._typewriter_text(text, x, y, color, delay), block)
+    
+    def _typewriter_text(self, text, x, y, color, delay):
+        gfx = self.gfx
+        h = gfx.measure_text(text)[1]
+        cx = x
+        for i in range(len(text)):
+            # Стираем курсор и печатаем очередной символ на его месте
+            gfx.fill_rect(cx, y, 2, h, 0)
+            gfx.char(text[i], cx, y, color)
+            cx += gfx.measure_text(text[i])[0] + 1
             
             # Курсор
-            if i < len(text):
-                cursor_x = x + i * self.gfx._font_width
-                self.gfx.vline(cursor_x, y, self.gfx._font_height, color)
+            if i < len(text) - 1:
+                gfx.vline(cx, y, h, color)
             
-            self.gfx.update()
-            sleep_ms(delay)
+            yield delay
         
         # Убираем курсор
-        self.gfx.fill_rect(x + len(text)*self.gfx._font_width, y, 
-                          2, self.gfx._font_height, 0)
-        self.gfx.update()
+        gfx.fill_rect(cx, y, 2, h, 0)
 
-    def fade_in(self, steps=10, delay=30):
+    def fade_in(self, steps=10, delay=30, block=True):
         """Плавное появление через шум"""
+        return self._play(self._fade_in(steps, delay), block)
+    
+    def _fade_in(self, steps, delay):
+        # Каждый шаг добавляет (OR) редкий шум - покрытие растёт кадр за кадром
+        pool = NoisePool(density=1.5 / steps, seed=self.rng.next())
         for i in range(steps):
-            # Генерация шума с увеличивающейся плотностью
-            for _ in range(i * 20):
-                x = randint(0, self.gfx.width-1)
-                y = randint(0, self.gfx.height-1)
-                self.gfx.pixel(x, y, 1)
-            self.gfx.update()
-            sleep_ms(delay)
+            pool.fill(self.gfx.buffer, OR)
+            self.gfx.mark_dirty()
+            yield delay
         self.gfx.fill_screen(1)
 
-    def particle_explosion(self, x, y, particles=20, color=1):
+    def particle_explosion(self, x, y, particles=20, color=1, block=True):
         """Взрыв частиц с физикой"""
-        positions = []
-        for _ in range(particles):
-            angle = random() * 2 * pi
-            speed = 0.5 + random() * 2
-            positions.append([x, y, cos(angle)*speed, sin(angle)*speed])
-        
+        return self._play(self._particle_explosion(x, y, particles, color), block)
+    
+    def _particle_explosion(self, x, y, particles, color):
+        # Скорость 0.5..2.5 пикселя и гравитация 0.1 пикселя за кадр - в 1/256
+        system = ParticleSystem(particles, gravity=26, seed=self.rng.next(),
+                                bounds=(self.gfx.width, self.gfx.height))
+        system.emit(x, y, particles, speed=(128, 640), life=(25, 26))
         for _ in range(25):  # Количество кадров анимации
-            self.gfx.fill_screen(0)
-            for p in positions:
-                p[0] += p[2]  # X
-                p[1] += p[3]  # Y
-                p[3] += 0.1   # Гравитация
-                
-                if 0 <= p[0] < self.gfx.width and 0 <= p[1] < self.gfx.height:
-                    self.gfx.pixel(int(p[0]), int(p[1]), color)
-            
-            self.gfx.update()
-            sleep_ms(50)
+            system.step()
+            self.gfx.draw_particles(system, color)  # Стирает только прошлые точки
+            yield 50
+
+    def fountain(self, x, y, duration=2000, rate=3, particles=200, color=1, block=True):
+        """Фонтан частиц вверх из точки (x, y): rate частиц за кадр, не больше particles сразу"""
+        return self._play(self._fountain(x, y, duration, rate, particles, color), block)
+    
+    def _fountain(self, x, y, duration, rate, particles, color):
+        system = ParticleSystem(particles, gravity=20, seed=self.rng.next(),
+                                bounds=(self.gfx.width, self.gfx.height))
+        system.add(Emitter(x, y, rate, speed=(384, 768), life=(30, 60), angle=48, spread=8))
+        start = ticks_ms()
+        while ticks_diff(ticks_ms(), start) < duration:
+            system.step()
+            self.gfx.draw_particles(system, color)
+            yield 0  # Каждый кадр планировщика
+        system.clear()
+        self.gfx.draw_particles(system, color)  # Стереть оставшиеся
 
-    def ripple(self, x, y, max_radius, color=1):
+    def ripple(self, x, y, max_radius, color=1, block=True):
         """Эффект кругов на воде"""
+        return self._play(self._ripple(x, y, max_radius, color), block)
+    
+    def _ripple(self, x, y, max_radius, color):
         for r in range(1, max_radius):
             self.gfx.circle(x, y, r, color)
-            self.gfx.update()
-            sleep_ms(30)
+            yield 30
             self.gfx.circle(x, y, r, 0)  # Стираем предыдущий круг
-        self.gfx.update()
 
-    def parallax_scroll(self, layers, speed=2):
-        """Параллакс-скроллинг для многослойной графики"""
+    def parallax_scroll(self, layers, speed=2, block=True):
+        """Параллакс-скроллинг для многослойной графики.
+        layers - слои sillyGFX.tilemap.Layer от дальнего к ближнему: слой глубины d
+        сдвигается в d+1 раз медленнее, прокрутка заворачивается по ширине карты"""
+        return self._play(self._parallax_scroll(layers, speed), block)
+    
+    def _parallax_scroll(self, layers, speed):
         for offset in range(0, self.gfx.width*2, speed):
-            self.gfx.fill_screen(0)
+            if layers[0].transparent:
+                self.gfx.fill_screen(0)  # Непрозрачный дальний слой сам перекрывает фон
             for depth, layer in enumerate(layers):
-                layer_width = len(layer[0]) if hasattr(layer[0], '__len__') else self.gfx.width
-                pos = (offset // (depth+1)) % layer_width
-                self.gfx.bitmap(layer, -pos, 0)
-            self.gfx.update()
-            sleep_ms(50)
\ No newline at end of file
+                layer.scroll_to(offset // (depth+1), layer.scroll_y)
+                self.gfx.draw_layer(layer)
+            yield 50
\ No newline at end of file
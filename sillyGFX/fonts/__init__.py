@@ -1,10 +1,12 @@
-from sillyGFX.fonts.font5x7 import DATA as font5x7_data, WIDTH as font5x7_width, HEIGHT as font5x7_height
-from sillyGFX.fonts.font8x16 import DATA as font8x16_data, WIDTH as font8x16_width, HEIGHT as font8x16_height
+# Словари шрифтов импортируются только при первом обращении
+from sillyGFX.fonts.packed import PackedFont, pack_font, load_font
 
 def get_font_5x7():
-    return font5x7_data, font5x7_width, font5x7_height
+    from sillyGFX.fonts.font5x7 import DATA, WIDTH, HEIGHT
+    return DATA, WIDTH, HEIGHT
 
 def get_font_8x16():
-    return font8x16_data, font8x16_width, font8x16_height
+    from sillyGFX.fonts.font8x16 import DATA, WIDTH, HEIGHT
+    return DATA, WIDTH, HEIGHT
 
-__all__ = ['get_font_5x7', 'get_font_8x16']
\ No newline at end of file
+__all__ = ['get_font_5x7', 'get_font_8x16', 'PackedFont', 'pack_font', 'load_font']
\ No newline at end of file
@@ -185,4 +185,4 @@ WIDTH = 8
 HEIGHT = 16
 for c in 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ':
     if c not in DATA:
-        DATA[c] = DATA.get(c.lower(), [0x00]*WIDTH)  # Заполняем пустыми или строчными
\ No newline at end of file
+        DATA[c] = DATA.get(c.lower(), [0x00]*HEIGHT)  # Заполняем пустыми или строчными
\ No newline at end of file
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Упакованные шрифты: непрерывный блок байтов глифов + отсортированный индекс.
+
+Формат файла (.sgf, little-endian):
+    b'SGF1', width u8, height u8, размер глифа u8, флаги u8, count u16
+    индекс: count x u16 (кодовые точки по возрастанию)
+    глифы:  count x размер глифа байт
+
+Флаг ROWS: глиф хранится строками (как font8x16), иначе столбцами MONO_VLSB (как font5x7).
+"""
+import struct
+
+MAGIC = b'SGF1'
+ROWS = 0x01
+_HEADER = '<4sBBBBH'
+_HEADER_SIZE = 10
+
+
+def glyph_size(width, height, rows=False):
+    """Байт на глиф: строки по ceil(width/8) байт или столбцы по страницам"""
+    if rows:
+        return height * ((width + 7) // 8)
+    return width * ((height + 7) // 8)
+
+
+def pack_font(data, width, height, rows=False, path=None):
+    """Конвертер словаря DATA в упакованный формат. Возвращает bytes,
+    при указании path ещё и записывает файл"""
+    size = glyph_size(width, height, rows)
+    chars = sorted(c for c in data if len(c) == 1 and ord(c) <= 0xFFFF)
+    index = struct.pack('<%dH' % len(chars), *[ord(c) for c in chars])  # Порядок байт - как в _find
+    blob = bytearray(size * len(chars))
+    for i, c in enumerate(chars):
+        glyph = data[c][:size]
+        blob[i * size:i * size + len(glyph)] = bytes(glyph)  # Короткие глифы дополняются нулями
+    packed = struct.pack(_HEADER, MAGIC, width, height, size, ROWS if rows else 0, len(chars))
+    packed += index + bytes(blob)
+    if path:
+        with open(path, 'wb') as f:
+            f.write(packed)
+    return packed
+
+
+class PackedFont:
+    """Шрифт с поиском глифа двоичным поиском по индексу.
+
+    source - bytes (например, константа во frozen-модуле, остаётся во flash)
+    или имя файла: тогда в RAM читается только индекс, а глифы подгружаются
+    через readinto по мере обращения и держатся в кэше на cache глифов"""
+    def __init__(self, source, cache=32):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._blob = memoryview(source)
+            self._file = None
+            header = bytes(self._blob[:_HEADER_SIZE])
+        else:
+            self._blob = None
+            self._file = open(source, 'rb')
+            header = self._file.read(_HEADER_SIZE)
+        magic, self.width, self.height, self.size, flags, count = struct.unpack(_HEADER, header)
+        if magic != MAGIC:
+            raise ValueError("Неизвестный формат шрифта")
+        self.rows = bool(flags & ROWS)
+        self._cache = {}
+        self._cache_size = cache
+        self._count = count
+        self._glyphs = _HEADER_SIZE + 2 * count
+        if self._file:
+            # Индекс - 2 байта на глиф, единственное, что живёт в RAM
+            self._index = bytearray(2 * count)
+            self._file.readinto(self._index)
+        else:
+            self._index = self._blob[_HEADER_SIZE:self._glyphs]
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, char):
+        return self._find(char) >= 0
+
+    def _find(self, char):
+        """Позиция символа в индексе или -1"""
+        cp = ord(char)
+        index = self._index
+        lo = 0
+        hi = self._count - 1
+        while lo <= hi:
+            mid = (lo + hi) >> 1
+            v = index[2 * mid] | (index[2 * mid + 1] << 8)
+            if v < cp:
+                lo = mid + 1
+            elif v > cp:
+                hi = mid - 1
+            else:
+                return mid
+        return -1
+
+    def get(self, char, default=None):
+        """Байты глифа (как список из DATA) или default"""
+        i = self._find(char) if len(char) == 1 else -1
+        if i < 0:
+            return default
+        start = self._glyphs + i * self.size
+        if self._file is None:
+            return self._blob[start:start + self.size]
+        cache = self._cache
+        glyph = cache.get(i)
+        if glyph is None:
+            if len(cache) >= self._cache_size:
+                cache.pop(next(iter(cache)))  # Вытесняется любой - кэш маленький
+            glyph = bytearray(self.size)
+            self._file.seek(start)
+            self._file.readinto(glyph)
+            cache[i] = glyph
+        return glyph
+
+    def __getitem__(self, char):
+        glyph = self.get(char)
+        if glyph is None:
+            raise KeyError(char)
+        return glyph
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._cache = {}
+
+
+def load_font(source):
+    """Упакованный шрифт в виде (данные, ширина, высота) - как get_font_5x7()"""
+    font = PackedFont(source)
+    return font, font.width, font.height
+
+
+if __name__ == '__main__':
+    # Конвертация встроенных шрифтов на ПК: python -m sillyGFX.fonts.packed
+    from sillyGFX.fonts import font5x7, font8x16
+    pack_font(font5x7.DATA, font5x7.WIDTH, font5x7.HEIGHT, path='font5x7.sgf')
+    pack_font(font8x16.DATA, font8x16.WIDTH, font8x16.HEIGHT, rows=True, path='font8x16.sgf')
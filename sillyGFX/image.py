@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Родной формат картинок SillyGFX (.sgi): байты уже в порядке страниц MONO_VLSB.
+
+Формат (little-endian):
+    b'SGI1', width u16, height u16
+    ceil(height / 8) страниц по width байт, бит 0 - верхняя строка страницы
+
+Конвертер из BMP, XBM и PGM запускается на ПК:
+    python -m sillyGFX.image logo.bmp logo.sgi [порог]
+"""
+MAGIC = b'SGI1'
+HEADER_SIZE = 8
+
+
+def read_header(f):
+    """(ширина, высота) из заголовка открытого .sgi файла"""
+    header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:4] != MAGIC:
+        raise ValueError("не SGI")
+    return header[4] | header[5] << 8, header[6] | header[7] << 8
+
+
+def pack_image(rows, threshold=128):
+    """Строки яркостей 0..255 (сверху вниз) -> содержимое .sgi"""
+    h = len(rows)
+    w = len(rows[0]) if h else 0
+    data = bytearray(w * ((h + 7) // 8))
+    for y in range(h):
+        base = (y >> 3) * w
+        bit = 1 << (y & 7)
+        row = rows[y]
+        for x in range(w):
+            if row[x] > threshold:
+                data[base + x] |= bit
+    return MAGIC + bytes((w & 0xFF, w >> 8, h & 0xFF, h >> 8)) + bytes(data)
+
+
+def _load_bmp(path):
+    """1/4/8/24/32-bit BMP -> строки яркостей сверху вниз"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:2] != b'BM':
+        raise ValueError("не BMP")
+    u32 = lambda o: int.from_bytes(data[o:o + 4], 'little')
+    offset = u32(10)
+    w = u32(18)
+    h = u32(22)
+    bpp = data[28] | data[29] << 8
+    top_down = h >= 0x80000000
+    if top_down:
+        h = 0x100000000 - h
+    palette = []
+    if bpp <= 8:
+        base = 14 + u32(14)
+        for i in range(u32(46) or 1 << bpp):
+            b, g, r = data[base + 4 * i:base + 4 * i + 3]
+            palette.append((77 * r + 150 * g + 29 * b) >> 8)
+    row_size = ((w * bpp + 31) // 32) * 4
+    rows = []
+    for y in range(h):
+        o = offset + (y if top_down else h - 1 - y) * row_size
+        row = []
+        for x in range(w):
+            if bpp >= 24:
+                p = o + x * (bpp >> 3)
+                row.append((77 * data[p + 2] + 150 * data[p + 1] + 29 * data[p]) >> 8)
+            else:
+                bit = x * bpp
+                idx = data[o + (bit >> 3)] >> (8 - bpp - (bit & 7)) & ((1 << bpp) - 1)
+                row.append(palette[idx])
+        rows.append(row)
+    return rows
+
+
+def _load_pgm(path):
+    """PGM (P5 двоичный или P2 текстовый) -> строки яркостей"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    fields = []
+    pos = 0
+    # Заголовок: магия, ширина, высота, максимум; '#' - комментарии
+    while len(fields) < 4:
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b'#':
+            pos = data.index(b'\n', pos)
+            continue
+        end = pos
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    magic, w, h, maxval = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    if magic == b'P5':
+        pixels = data[pos + 1:pos + 1 + w * h]
+    elif magic == b'P2':
+        pixels = [int(v) for v in data[pos:].split()]
+    else:
+        raise ValueError("не PGM")
+    return [[pixels[y * w + x] * 255 // maxval for x in range(w)] for y in range(h)]
+
+
+def _load_xbm(path):
+    """XBM -> строки яркостей (установленный бит - светящийся пиксель, как в draw_xbm)"""
+    with open(path) as f:
+        content = f.read()
+    size = {}
+    for line in content.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[0] == '#define':
+            size[parts[1].rsplit('_', 1)[-1]] = int(parts[2])
+    w = size['width']
+    h = size['height']
+    body = content[content.index('{') + 1:content.index('}')]
+    data = [int(v, 16) for v in body.replace(',', ' ').split()]
+    stride = (w + 7) // 8
+    return [[255 if data[y * stride + (x >> 3)] >> (x & 7) & 1 else 0 for x in range(w)]
+            for y in range(h)]
+
+
+def convert(src, dst=None, threshold=128):
+    """BMP/XBM/PGM -> .sgi. Возвращает bytes, при указании dst записывает файл"""
+    ext = src.rsplit('.', 1)[-1].lower()
+    loader = {'bmp': _load_bmp, 'xbm': _load_xbm, 'pgm': _load_pgm}.get(ext)
+    if loader is None:
+        raise ValueError("неизвестный формат: " + ext)
+    packed = pack_image(loader(src), threshold)
+    if dst:
+        with open(dst, 'wb') as f:
+            f.write(packed)
+    return packed
+
+
+if __name__ == '__main__':
+    import sys
+    convert(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 128)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Быстрый шум: 32-битный xorshift и пул готовых шумовых страниц.
+Буфер заполняется словами по 4 байта (через uctypes, если он есть),
+а покадровый шум - копированием страниц пула со сдвигом, без random() на пиксель"""
+try:
+    import uctypes
+except ImportError:
+    uctypes = None
+
+COPY = 0
+OR = 1
+AND = 2
+
+
+def _words(buf):
+    """Вид буфера как массива 32-битных слов или None, если uctypes недоступен"""
+    try:
+        layout = {'w': (uctypes.ARRAY | 0, uctypes.UINT32 | (len(buf) >> 2))}
+        return uctypes.struct(uctypes.addressof(buf), layout).w
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _density(density):
+    """Плотность 0..1 -> доля из 256"""
+    return max(0, min(256, int(density * 256 + 0.5)))
+
+
+class XorShift32:
+    """Генератор xorshift32 (Марсалья): три сдвига на 32 случайных бита"""
+    def __init__(self, seed=0x2545F491):
+        self.state = (seed & 0xFFFFFFFF) or 0x2545F491  # Нулевое состояние вырождено
+
+    def next(self):
+        x = self.state
+        x ^= (x << 13) & 0xFFFFFFFF
+        x ^= x >> 17
+        x ^= (x << 5) & 0xFFFFFFFF
+        self.state = x
+        return x
+
+    def word(self, density=0.5):
+        """32 бита, каждый равен 1 с вероятностью density (точность 1/256)"""
+        return self._word(_density(density))
+
+    def _word(self, d):
+        """Слова смешиваются через AND/OR по двоичным разрядам доли d из 256"""
+        if d >= 256:
+            return 0xFFFFFFFF
+        if d <= 0:
+            return 0
+        k = 0
+        while not d >> k & 1:
+            k += 1  # Младший значащий разряд
+        r = self.next()
+        for i in range(k + 1, 8):
+            if d >> i & 1:
+                r |= self.next()
+            else:
+                r &= self.next()
+        return r
+
+    def fill(self, buf, density=0.5):
+        """Заполнение буфера шумом по 4 байта за шаг генератора"""
+        d = _density(density)
+        n = len(buf)
+        words = _words(buf)
+        start = 0
+        if words is not None:
+            for i in range(n >> 2):
+                words[i] = self._word(d)
+            start = n & ~3
+        for i in range(start, n, 4):
+            r = self._word(d)
+            for k in range(min(4, n - i)):
+                buf[i + k] = r & 0xFF
+                r >>= 8
+
+
+class NoisePool:
+    """Пул заранее посчитанных шумовых страниц. fill() собирает кадр из страниц
+    пула с новым сдвигом и порядком: один шаг генератора на кадр"""
+    def __init__(self, size=128, count=4, density=0.5, seed=0x2545F491):
+        self.size = size
+        self.rng = XorShift32(seed)
+        self.pages = []
+        for _ in range(count):
+            page = bytearray(2 * size)  # Страница повторена дважды: сдвиг без заворота
+            self.rng.fill(memoryview(page)[:size], density)
+            page[size:] = page[:size]
+            self.pages.append(page)
+
+    def fill(self, buf, op=COPY):
+        """Шум в буфер: COPY - заменить, OR - добавить точки, AND - выбить точки"""
+        size = self.size
+        pages = self.pages
+        count = len(pages)
+        r = self.rng.next()
+        first = r & 0xFF
+        offset = (r >> 8) % size
+        mv = memoryview(buf)
+        n = len(buf)
+        i = 0
+        k = 0
+        while i < n:
+            m = min(size, n - i)
+            src = pages[(first + k) % count]
+            o = (offset + 37 * k) % size
+            if op == COPY:
+                mv[i:i + m] = memoryview(src)[o:o + m]
+            elif op == OR:
+                for j in range(m):
+                    buf[i + j] |= src[o + j]
+            else:
+                for j in range(m):
+                    buf[i + j] &= src[o + j]
+            i += m
+            k += 1
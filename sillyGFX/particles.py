@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Частицы: пул фиксированного размера в столбцах array с фиксированной точкой.
+Позиция - array('i'), скорость и время жизни - array('h'), дробная часть FP бит.
+Физика - ParticleSystem.step(), вывод со стиранием прошлого кадра - SillyGFX.draw_particles()"""
+from array import array
+from math import sin, cos, pi
+from sillyGFX.noise import XorShift32
+
+FP = 8          # Бит дробной части: 256 = 1 пиксель (за кадр - для скорости)
+ONE = 1 << FP
+DIRECTIONS = 64  # Направлений в круге (единица угла для emit и Emitter)
+
+# Единичные векторы направлений в фиксированной точке, считаются один раз
+_DX = array('h', [int(cos(2 * pi * i / DIRECTIONS) * ONE) for i in range(DIRECTIONS)])
+_DY = array('h', [int(sin(2 * pi * i / DIRECTIONS) * ONE) for i in range(DIRECTIONS)])
+
+
+class Emitter:
+    """Источник частиц: rate частиц за кадр (может быть дробным),
+    speed и life - диапазоны (мин, макс) в 1/256 пикселя за кадр и в кадрах,
+    angle и spread - направление и ширина конуса в 1/64 круга (0 - вправо, 16 - вниз).
+    frames - сколько кадров работать (-1 - пока не выключат active)"""
+    __slots__ = ('x', 'y', 'rate', 'speed', 'life', 'angle', 'spread',
+                 'frames', 'active', '_acc')
+
+    def __init__(self, x, y, rate=1, speed=(128, 512), life=(20, 40),
+                 angle=0, spread=DIRECTIONS, frames=-1):
+        self.x = x
+        self.y = y
+        self.rate = int(rate * 256)  # Частиц за кадр в 1/256
+        self.speed = speed
+        self.life = life
+        self.angle = angle
+        self.spread = spread
+        self.frames = frames
+        self.active = True
+        self._acc = 0
+
+
+class ParticleSystem:
+    """Пул на capacity частиц. Живые частицы лежат в начале столбцов,
+    погибшая заменяется последней - без аллокаций и сборки мусора.
+    gravity - прибавка к вертикальной скорости за кадр (1/256 пикселя),
+    bounds=(w, h) - частицы, улетевшие вбок или вниз за эту область, гибнут"""
+    FP = FP  # Для вывода без импорта модуля
+    def __init__(self, capacity=128, gravity=0, bounds=None, seed=0x2545F491):
+        self.capacity = capacity
+        self.gravity = gravity
+        self.bounds = bounds
+        self.count = 0
+        self.x = array('i', bytes(4 * capacity))
+        self.y = array('i', bytes(4 * capacity))
+        self.vx = array('h', bytes(2 * capacity))
+        self.vy = array('h', bytes(2 * capacity))
+        self.life = array('h', bytes(2 * capacity))
+        self.emitters = []
+        self.rng = XorShift32(seed)
+        # Пиксели прошлого вывода (индекс байта буфера и маска бита) - для стирания
+        self._old = array('h', bytes(2 * capacity))
+        self._old_mask = bytearray(capacity)
+        self._old_count = 0
+        self._box = array('h', (0, 0, -1, -1))  # Грязная область прошлого вывода (логическая)
+
+    def emit(self, x, y, count=1, speed=(128, 512), life=(20, 40),
+             angle=0, spread=DIRECTIONS):
+        """Выпуск count частиц из точки (x, y) в пикселях. Лишние при полном пуле
+        отбрасываются. Возвращает число выпущенных"""
+        n = self.count
+        count = min(count, self.capacity - n)
+        fx = x << FP
+        fy = y << FP
+        s0, s1 = speed
+        l0, l1 = life
+        ds = s1 - s0
+        dl = l1 - l0 + 1
+        a0 = angle - (spread >> 1)
+        rng = self.rng
+        px = self.x
+        py = self.y
+        pvx = self.vx
+        pvy = self.vy
+        plife = self.life
+        for i in range(n, n + count):
+            r = rng.next()  # Один шаг генератора на частицу: по байту на угол, скорость, жизнь
+            d = (a0 + ((r & 0xFF) * spread >> 8)) & (DIRECTIONS - 1)
+            v = s0 + ((r >> 8 & 0xFF) * ds >> 8)
+            px[i] = fx
+            py[i] = fy
+            pvx[i] = _DX[d] * v >> FP
+            pvy[i] = _DY[d] * v >> FP
+            plife[i] = l0 + ((r >> 16 & 0xFF) * dl >> 8)
+        self.count = n + count
+        return count
+
+    def add(self, emitter):
+        self.emitters.append(emitter)
+        return emitter
+
+    def remove(self, emitter):
+        if emitter in self.emitters:
+            self.emitters.remove(emitter)
+
+    def clear(self):
+        """Убрать все частицы (следующий draw_particles сотрёт их с экрана)"""
+        self.count = 0
+
+    def step(self):
+        """Один кадр: работа источников, гравитация, движение, старение.
+        Возвращает число живых частиц"""
+        for e in self.emitters:
+            if not e.active:
+                continue
+            e._acc += e.rate
+            if e._acc >= 256:
+                self.emit(e.x, e.y, e._acc >> 8, e.speed, e.life, e.angle, e.spread)
+                e._acc &= 0xFF
+            if e.frames > 0:
+                e.frames -= 1
+                if not e.frames:
+                    e.active = False
+        g = self.gravity
+        px = self.x
+        py = self.y
+        pvx = self.vx
+        pvy = self.vy
+        plife = self.life
+        if self.bounds:
+            left = 0
+            w = self.bounds[0] << FP
+            h = self.bounds[1] << FP
+        else:
+            left = -0x80000000  # Без bounds частицы живут до конца life
+            w = h = 0x7FFFFFFF
+        n = self.count
+        i = 0
+        while i < n:
+            l = plife[i] - 1
+            v = pvy[i] + g
+            x = px[i] + pvx[i]
+            y = py[i] + v
+            if l <= 0 or x < left or x >= w or y >= h:
+                # Гибель: на место частицы встаёт последняя живая
+                n -= 1
+                px[i] = px[n]
+                py[i] = py[n]
+                pvx[i] = pvx[n]
+                pvy[i] = pvy[n]
+                plife[i] = plife[n]
+                continue
+            if v > 0x7FFF:
+                v = 0x7FFF  # Предел array('h') - 127 пикселей за кадр
+            elif v < -0x8000:
+                v = -0x8000  # Отрицательная гравитация (дым, пузыри)
+            plife[i] = l
+            pvy[i] = v
+            px[i] = x
+            py[i] = y
+            i += 1
+        self.count = n
+        return n
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Спрайты: лист кадров компилируется один раз, спрайты - лёгкие объекты
+с позицией, кадром и отражениями. Вывод пачкой - SillyGFX.draw_sprites()"""
+import framebuf
+from sillyGFX.core import _flip_x, _transpose, _lsb_rows_to_vlsb, rotate_bitmap
+from sillyGFX.image import read_header
+
+
+class SpriteSheet:
+    """Лист кадров frame_w x frame_h в буфере MONO_VLSB (как в .sgi).
+    Кадры нумеруются слева направо, сверху вниз. Готовые FrameBuffer кадров
+    (с отражениями и для портрета) создаются при первом выводе и кэшируются"""
+    def __init__(self, buf, w, h, frame_w, frame_h, key=0):
+        self.buf = buf
+        self.w = w
+        self.h = h
+        self.frame_w = frame_w
+        self.frame_h = frame_h
+        self.key = key  # Прозрачный цвет кадров (-1 - непрозрачные)
+        self.columns = w // frame_w
+        self.count = self.columns * (h // frame_h)
+        self._frames = {}
+
+    @classmethod
+    def from_sgi(cls, filename, frame_w, frame_h, key=0):
+        """Лист из файла .sgi (см. sillyGFX.image)"""
+        with open(filename, 'rb') as f:
+            w, h = read_header(f)
+            buf = bytearray(w * ((h + 7) >> 3))
+            f.readinto(buf)
+        return cls(buf, w, h, frame_w, frame_h, key)
+
+    @classmethod
+    def from_bitmap(cls, data, w, h, frame_w, frame_h, key=0):
+        """Лист из bitmap строками (младший бит слева, как XBM и draw_bitmap)"""
+        return cls(_lsb_rows_to_vlsb(data, w, h), w, h, frame_w, frame_h, key)
+
+    def frame(self, index, flip_x=False, flip_y=False, swap_xy=False):
+        """FrameBuffer кадра; для портрета (swap_xy) - уже транспонированный"""
+        key = (index, flip_x, flip_y, swap_xy)
+        fb = self._frames.get(key)
+        if fb is not None:
+            return fb
+        fw = self.frame_w
+        fh = self.frame_h
+        # Вырезаем кадр из листа через blit во временный буфер
+        buf = bytearray(fw * ((fh + 7) >> 3))
+        sheet = framebuf.FrameBuffer(self.buf, self.w, self.h, framebuf.MONO_VLSB)
+        framebuf.FrameBuffer(buf, fw, fh, framebuf.MONO_VLSB).blit(
+            sheet, -(index % self.columns) * fw, -(index // self.columns) * fh)
+        if flip_y:
+            # Отражение по Y = поворот на 180 + отражение по X
+            buf = rotate_bitmap(buf, fw, fh, 180)[0]
+            flip_x = not flip_x
+        if flip_x:
+            _flip_x(buf, fw, (fh + 7) >> 3)
+        if swap_xy:
+            fb = framebuf.FrameBuffer(_transpose(buf, fw, fh), fh, fw, framebuf.MONO_VLSB)
+        else:
+            fb = framebuf.FrameBuffer(buf, fw, fh, framebuf.MONO_VLSB)
+        self._frames[key] = fb
+        return fb
+
+
+class Sprite:
+    """Спрайт: позиция, кадр листа и отражения. Никаких буферов внутри"""
+    __slots__ = ('sheet', 'x', 'y', 'frame', 'flip_x', 'flip_y', 'visible', '_ox', '_oy')
+
+    def __init__(self, sheet, x=0, y=0, frame=0, flip_x=False, flip_y=False):
+        self.sheet = sheet
+        self.x = x
+        self.y = y
+        self.frame = frame
+        self.flip_x = flip_x
+        self.flip_y = flip_y
+        self.visible = True
+        self._ox = None  # Где спрайт был нарисован в прошлый раз (для стирания)
+        self._oy = None
+
+    def move(self, dx, dy):
+        self.x += dx
+        self.y += dy
+
+    def next_frame(self):
+        """Следующий кадр анимации по кругу"""
+        self.frame = (self.frame + 1) % self.sheet.count
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Тайловые карты и слои: набор плиток компилируется в FrameBuffer один раз,
+слой хранит только индексы плиток и смещение прокрутки. Вывод - SillyGFX.draw_layer()"""
+from sillyGFX.sprite import SpriteSheet
+from sillyGFX.core import _lsb_rows_to_vlsb
+from sillyGFX.image import read_header
+
+
+class TileSet(SpriteSheet):
+    """Квадратные плитки tile x tile из листа MONO_VLSB.
+    Для плиток 8x8 доступны сырые 8 байт столбцов (быстрый путь без blit)"""
+    def __init__(self, buf, w, h, tile=8, key=-1):
+        SpriteSheet.__init__(self, buf, w, h, tile, tile, key)
+        self.tile = tile
+        self._bytes = {}
+
+    @classmethod
+    def from_sgi(cls, filename, tile=8):
+        with open(filename, 'rb') as f:
+            w, h = read_header(f)
+            buf = bytearray(w * ((h + 7) >> 3))
+            f.readinto(buf)
+        return cls(buf, w, h, tile)
+
+    @classmethod
+    def from_bitmap(cls, data, w, h, tile=8):
+        """Набор из bitmap строками (младший бит слева, как XBM)"""
+        return cls(_lsb_rows_to_vlsb(data, w, h), w, h, tile)
+
+    def tile_bytes(self, index):
+        """8 байт столбцов плитки 8x8 (плитка занимает ровно одну страницу)"""
+        data = self._bytes.get(index)
+        if data is None:
+            o = (index // self.columns) * self.w + (index % self.columns) * 8
+            data = bytes(self.buf[o:o + 8])
+            self._bytes[index] = data
+        return data
+
+
+class Layer:
+    """Слой карты: map_w x map_h индексов плиток, прокрутка с заворотом.
+    Выводится в горизонтальную полосу экрана y..y+height (y может быть
+    отрицательным и не кратным 8; при плитках 8x8, y, height и прокрутке по
+    вертикали, кратных 8, в альбомной ориентации байты плиток копируются прямо в страницы).
+    empty - индекс пустой плитки, которая не рисуется (в непрозрачном слое - стирается)"""
+    def __init__(self, tiles, tilemap, map_w, map_h, y=0, height=None,
+                 transparent=False, empty=-1):
+        self.tiles = tiles
+        self.map = tilemap
+        self.map_w = map_w
+        self.map_h = map_h
+        self.y = y
+        self.height = height
+        self.transparent = transparent
+        self.empty = empty
+        self.width_px = map_w * tiles.tile
+        self.height_px = map_h * tiles.tile
+        self.scroll_x = 0
+        self.scroll_y = 0
+        self._band = None  # (ключ, FrameBuffer полосы экрана)
+
+    def scroll(self, dx, dy=0):
+        """Сдвиг прокрутки с заворотом по размеру карты"""
+        self.scroll_x = (self.scroll_x + dx) % self.width_px
+        self.scroll_y = (self.scroll_y + dy) % self.height_px
+
+    def scroll_to(self, x, y=0):
+        self.scroll_x = x % self.width_px
+        self.scroll_y = y % self.height_px
+
+    def tile_at(self, col, row):
+        return self.map[(row % self.map_h) * self.map_w + col % self.map_w]
+
+    def set_tile(self, col, row, index):
+        self.map[(row % self.map_h) * self.map_w + col % self.map_w] = index